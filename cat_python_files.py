@@ -1,145 +1,314 @@
 #!/usr/bin/env python3
 """Script to combine multiple Python files with shortened docstrings."""
 
-import ast
+import argparse
+import hashlib
 import os
+import re
 import sys
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
 
+if TYPE_CHECKING:
+    import ast
 
-class DocstringShortener(ast.NodeVisitor):
-    """AST visitor that shortens docstrings to their first sentence."""
+try:
+    import xxhash
+except ImportError:  # optional, falls back to hashlib
+    xxhash = None
+
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cat_python_files")
+CACHE_VERSION = "4"  # bump whenever the produced output changes
+MEMO_SIZE = 16  # shortened sources kept in memory, least recently used dropped first
+
+
+FIRST_SENTENCE_RE = re.compile(r"\s*([^.]*?)\s*\.")  # stripped text before the first period
+FIRST_LINE_RE = re.compile(r"\s*(.*)")  # first non-blank line
+
+# AST fields holding nested statements (if/for/while/with/try/match blocks included)
+STATEMENT_LIST_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+# Each file is emitted as "<path>:" followed by a fenced code block
+CHUNK_HEADER = b":\n```\n"
+CHUNK_FOOTER = b"\n```\n\n"
+
+
+def _shorten_docstring(docstring: str) -> str:
+    """Extract the first sentence or line from a docstring.
     
-    def __init__(self):
-        self.changes = []
+    Shortened results are interned, since boilerplate docstrings repeat across files.
+    """
+    # Short one-liners with at most a closing period are already minimal
+    if len(docstring) < 80 and "\n" not in docstring:
+        period = docstring.find(".")
+        if period == -1 or (period == len(docstring) - 1 and not docstring[-2:-1].isspace()):
+            return docstring.strip()
     
-    def visit_Module(self, node):
-        """Process module-level docstring."""
-        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant):
-            docstring = node.body[0].value.value
-            if isinstance(docstring, str):
-                shortened = self._shorten_docstring(docstring)
-                if shortened != docstring:
-                    self.changes.append((node.body[0].value, shortened))
-        self.generic_visit(node)
-    
-    def visit_ClassDef(self, node):
-        """Process class docstrings."""
-        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant):
-            docstring = node.body[0].value.value
-            if isinstance(docstring, str):
-                shortened = self._shorten_docstring(docstring)
-                if shortened != docstring:
-                    self.changes.append((node.body[0].value, shortened))
-        self.generic_visit(node)
-    
-    def visit_FunctionDef(self, node):
-        """Process function docstrings."""
-        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant):
-            docstring = node.body[0].value.value
-            if isinstance(docstring, str):
-                shortened = self._shorten_docstring(docstring)
+    # Try to get the first sentence
+    match = FIRST_SENTENCE_RE.match(docstring)
+    if match and len(match.group(1)) > 10:  # Ensure we have a reasonable sentence
+        return sys.intern(match.group(1) + ".")
+    
+    # Fallback to first line if no proper sentence found
+    return sys.intern(FIRST_LINE_RE.match(docstring).group(1).strip())
+
+
+def find_docstring_edits(tree: "ast.AST") -> List[Tuple["ast.Constant", str]]:
+    """Collect module, class and function docstrings that can be shortened.
+    
+    Args:
+        tree: Parsed AST, walked over statements only
+        
+    Returns:
+        List of (docstring node, shortened docstring) pairs
+    """
+    import ast
+    
+    docstring_owners = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+    edits = []
+    # Docstring owners only appear in statement lists, so expressions are never visited
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, docstring_owners):
+            docstring = ast.get_docstring(node, clean=False)
+            if docstring:
+                shortened = _shorten_docstring(docstring)
                 if shortened != docstring:
-                    self.changes.append((node.body[0].value, shortened))
-        self.generic_visit(node)
-    
-    def _shorten_docstring(self, docstring: str) -> str:
-        """Extract the first sentence or line from a docstring."""
-        # Try to get the first sentence
-        docstring = docstring.strip()
-        if "." in docstring:
-            first_sentence = docstring.split(".", 1)[0].strip()
-            if len(first_sentence) > 10:  # Ensure we have a reasonable sentence
-                return first_sentence + "."
+                    edits.append((node.body[0].value, shortened))
+        for field in STATEMENT_LIST_FIELDS:
+            children = getattr(node, field, None)
+            if isinstance(children, list):
+                stack.extend(children)
+    return edits
+
+
+def _docstring_literal(original_literal: str, docstring: str) -> str:
+    """Write a docstring using the prefix and quotes of the literal it replaces."""
+    body = original_literal.lstrip("rRuU")
+    prefix = original_literal[:len(original_literal) - len(body)]
+    quote = body[:3] if body[:3] in ('"""', "'''") else body[0]
+    raw = "r" in prefix.lower()
+    if (quote[0] in docstring or docstring.endswith("\\")
+            or ("\\" in docstring and not raw)
+            or ("\n" in docstring and len(quote) == 1)
+            or not docstring.replace("\n", "").isprintable()):
+        return repr(docstring)
+    if "\r\n" in original_literal:  # keep the file's line endings
+        docstring = docstring.replace("\n", "\r\n")
+    return prefix + quote + docstring + quote
+
+
+def splice_docstrings(data: bytes, edits: List[Tuple["ast.Constant", str]]) -> bytes:
+    """Replace docstring literals in the source, keeping everything else intact.
+    
+    Args:
+        data: UTF-8 encoded source code the edits were collected from
+        edits: List of (docstring node, new docstring) pairs
         
-        # Fallback to first line if no proper sentence found
-        lines = docstring.split("\n")
-        return lines[0].strip()
+    Returns:
+        Encoded source code with the docstring literals replaced
+    """
+    # AST column offsets count UTF-8 bytes, so slice the encoded source directly
+    line_starts = [0]
+    for line in data.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    
+    chunks = []
+    last = 0
+    for node, docstring in sorted(edits, key=lambda edit: (edit[0].lineno, edit[0].col_offset)):
+        start = line_starts[node.lineno - 1] + node.col_offset
+        end = line_starts[node.end_lineno - 1] + node.end_col_offset
+        literal = _docstring_literal(data[start:end].decode('utf-8'), docstring)
+        chunks.append(data[last:start])
+        chunks.append(literal.encode('utf-8'))
+        last = end
+    chunks.append(data[last:])
+    return b"".join(chunks)
 
 
-class SourceCodeTransformer(ast.NodeTransformer):
-    """AST transformer that applies docstring changes."""
+class CachingProcessFile:
+    """Decorator caching shortened sources on disk, keyed by a content hash."""
+    
+    def __init__(self, func: Callable[[bytes], bytes], cache_dir: str = CACHE_DIR):
+        self.func = func
+        self.cache_dir = cache_dir
+        self.memo: "OrderedDict[str, bytes]" = OrderedDict()  # dedupes repeated inputs within one run
     
-    def __init__(self, changes):
-        self.changes = changes
+    def _key(self, source: bytes) -> str:
+        """Hash the source together with the interpreter and cache versions."""
+        data = source + (sys.version + CACHE_VERSION).encode('utf-8')
+        if xxhash is not None:
+            return xxhash.xxh128(data).hexdigest()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
     
-    def visit_Constant(self, node):
-        """Replace docstrings with shortened versions."""
-        for original_node, new_docstring in self.changes:
-            if node == original_node:
-                return ast.Constant(value=new_docstring)
-        return node
+    def __call__(self, source: bytes) -> bytes:
+        key = self._key(source)
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            return self.memo[key]
+        
+        cache_path = os.path.join(self.cache_dir, key)
+        try:
+            with open(cache_path, 'rb') as f:
+                result = f.read()
+        except OSError:
+            result = self.func(source)
+            self._store(cache_path, result)
+        
+        self.memo[key] = result
+        if len(self.memo) > MEMO_SIZE:
+            self.memo.popitem(last=False)
+        return result
+    
+    def _store(self, cache_path: str, result: bytes) -> None:
+        """Atomically write a cache entry; the cache is best-effort only."""
+        import tempfile
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp_")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(result)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
 
 
-def process_file(filepath: str) -> str:
+@CachingProcessFile
+def shorten_source(source: bytes) -> bytes:
+    """Shorten all docstrings in the given Python source.
+    
+    Args:
+        source: UTF-8 encoded Python source code
+        
+    Returns:
+        Modified source code, or the original if nothing changed
+    """
+    import ast  # imported lazily: cache hits and non-Python inputs never need it
+    
+    # Parse the source code into an AST
+    tree = ast.parse(source.decode('utf-8'))
+    
+    # Find docstrings to shorten
+    edits = find_docstring_edits(tree)
+    if edits:
+        # Splice the shortened literals into the original source
+        return splice_docstrings(source, edits)
+    
+    return source  # Return original if no changes
+
+
+def _read_file(filepath: str, size: Optional[int] = None) -> bytes:
+    """Read a whole file with a single read sized by the known or fstat'ed size."""
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        if size is None:
+            size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        while len(data) < size:  # short reads only happen for very large files
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data
+
+
+def process_file(filepath: str, size: Optional[int] = None) -> bytes:
     """Process a Python file, shortening its docstrings.
     
     Args:
         filepath: Path to the Python file
+        size: File size in bytes if already known, saves an fstat
         
     Returns:
-        Modified source code as string
+        Modified source code as UTF-8 encoded bytes
     """
+    source = b''
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            source = f.read()
-        
-        # Parse the source code into an AST
-        tree = ast.parse(source)
-        
-        # Find docstrings to shorten
-        shortener = DocstringShortener()
-        shortener.visit(tree)
+        source = _read_file(filepath, size)
         
-        # Apply the changes
-        if shortener.changes:
-            transformer = SourceCodeTransformer(shortener.changes)
-            modified_tree = transformer.visit(tree)
-            
-            # Generate modified source
-            modified_source = ast.unparse(modified_tree)
-            return modified_source
+        # Without triple-quoted strings there are no docstrings worth parsing for
+        if b'"""' not in source and b"'''" not in source:
+            return source
         
-        return source  # Return original if no changes
+        return shorten_source(source)
     except Exception as e:
-        return f"# Error processing {filepath}: {str(e)}\n\n{source if 'source' in locals() else ''}"
+        message = f"# Error processing {filepath}: {str(e)}\n\n".encode('utf-8')
+        return message + source
+
+
+def _check_path(file_path: str) -> Tuple[Optional[str], int]:
+    """Return the reason a path cannot be processed (None if it can) and its size."""
+    if not file_path.endswith('.py'):
+        return "Not a Python file", 0
+    try:
+        return None, os.stat(file_path).st_size
+    except OSError:
+        return "File not found", 0
 
 
-def combine_files(file_paths: List[str]) -> str:
-    """Combine multiple Python files into a single formatted string.
+def _process_files(file_paths: List[str], sizes: List[int], jobs: int) -> Iterator[bytes]:
+    """Process files in input order, in parallel worker processes if jobs > 1."""
+    if jobs > 1 and len(file_paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(process_file, file_paths, sizes, chunksize=8)
+    else:
+        yield from map(process_file, file_paths, sizes)
+
+
+def combine_files(file_paths: List[str], jobs: int = 1) -> Iterator[bytes]:
+    """Combine multiple Python files into formatted chunks, one per file.
     
     Args:
         file_paths: List of paths to Python files
+        jobs: Number of worker processes used to process the files
         
-    Returns:
-        Formatted string with all file contents
+    Yields:
+        Formatted content of each file as bytes, in input order
     """
-    result = []
+    checks = [_check_path(file_path) for file_path in file_paths]
+    found = [(file_path, size) for file_path, (problem, size) in zip(file_paths, checks) if problem is None]
+    processed = _process_files([file_path for file_path, _ in found], [size for _, size in found], jobs)
     
-    for file_path in file_paths:
-        if not os.path.exists(file_path):
-            result.append(f"{file_path}:\n```\n# File not found\n```\n\n")
+    for file_path, (problem, _) in zip(file_paths, checks):
+        if problem is not None:
+            yield b"".join((os.fsencode(file_path), CHUNK_HEADER, b"# ", problem.encode('utf-8'), CHUNK_FOOTER))
             continue
-            
-        if not file_path.endswith('.py'):
-            result.append(f"{file_path}:\n```\n# Not a Python file\n```\n\n")
-            continue
-            
-        processed_content = process_file(file_path)
-        result.append(f"{file_path}:\n```\n{processed_content}\n```\n\n")
-    
-    return "".join(result)
+        
+        processed_content = next(processed)
+        yield b"".join((os.fsencode(file_path), CHUNK_HEADER, processed_content, CHUNK_FOOTER))
 
 
 def main():
     """Main function to process files from command line arguments."""
-    if len(sys.argv) < 2:
-        print("Usage: python script.py file1.py file2.py ...")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Combine multiple Python files with shortened docstrings"
+    )
+    parser.add_argument("files", nargs="+", help="Python files to combine")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    args = parser.parse_args()
     
-    file_paths = sys.argv[1:]
-    output = combine_files(file_paths)
-    print(output)
+    out = sys.stdout.buffer
+    for chunk in combine_files(args.files, jobs=args.jobs):
+        out.write(chunk)
+    out.write(b"\n")
+    out.flush()
 
 
 if __name__ == "__main__":
@@ -4,7 +4,191 @@ import argparse
 import sys
 import unicodedata
 import json
+import glob
+import os
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from itertools import chain, repeat
+from operator import attrgetter, sub
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to json
+    orjson = None
+
+# Invisible Unicode characters, removed from the text
+INVISIBLE_CHARS = {
+    '\u200B': 'Zero Width Space',
+    '\u200C': 'Zero Width Non-Joiner',
+    '\u200D': 'Zero Width Joiner',
+    '\u202F': 'Narrow No-Break Space',
+    '\u2060': 'Word Joiner',
+    '\uFEFF': 'Zero Width No-Break Space'
+}
+
+# Homoglyphs (characters that look like standard ones) and their replacements
+HOMOGLYPH_MAP = {
+    # Cyrillic letters that look like Latin
+    'а': ('a', 'Cyrillic small letter a'),
+    'е': ('e', 'Cyrillic small letter ie'),
+    'о': ('o', 'Cyrillic small letter o'),
+    'р': ('p', 'Cyrillic small letter er'),
+    'с': ('c', 'Cyrillic small letter es'),
+    'х': ('x', 'Cyrillic small letter ha'),
+    'В': ('B', 'Cyrillic capital letter ve'),
+    'Н': ('H', 'Cyrillic capital letter en'),
+    'М': ('M', 'Cyrillic capital letter em'),
+    'К': ('K', 'Cyrillic capital letter ka'),
+    
+    # Other common homoglyphs NFKC normalization keeps as they are
+    'ɑ': ('a', 'Latin small letter alpha'),
+}
+
+# Unicode blocks where NFKC folds letters and digits to ASCII look-alikes: Letterlike Symbols,
+# Halfwidth and Fullwidth Forms, Mathematical Alphanumeric Symbols and Segmented Digits
+NFKC_HOMOGLYPH_BLOCKS = [(0x2100, 0x2150), (0xFF00, 0xFFF0), (0x1D400, 0x1D800), (0x1FBF0, 0x1FC00)]
+
+def _nfkc_homoglyphs():
+    """Derive homoglyphs of ASCII letters and digits from NFKC normalization."""
+    homoglyphs = {}
+    for start, end in NFKC_HOMOGLYPH_BLOCKS:
+        for codepoint in range(start, end):
+            char = chr(codepoint)
+            replacement = unicodedata.normalize('NFKC', char)
+            if (len(replacement) == 1 and replacement.isascii() and replacement.isalnum()
+                    and unicodedata.category(char) in ('Lu', 'Ll', 'Nd')):
+                # e.g. 'Mathematical bold capital A', keeping the case of the letter
+                words = unicodedata.name(char).capitalize().split(' ')
+                if len(words[-1]) == 1:
+                    words[-1] = replacement
+                homoglyphs[char] = (replacement, ' '.join(words))
+    return homoglyphs
+
+HOMOGLYPH_MAP.update(
+    (char, entry) for char, entry in _nfkc_homoglyphs().items() if char not in HOMOGLYPH_MAP
+)
+
+def _char_class(chars):
+    """Regex character class matching the given characters, as merged code point ranges."""
+    ranges = []
+    for codepoint in sorted(map(ord, chars)):
+        if ranges and ranges[-1][1] == codepoint - 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    # Long lists of single astral characters are checked one by one, ranges are not
+    return '[' + ''.join(
+        re.escape(chr(start)) if start == end else f'{re.escape(chr(start))}-{re.escape(chr(end))}'
+        for start, end in ranges
+    ) + ']'
+
+# Homoglyph keys as one character class (all keys are single characters, see CLEANUP_TABLE)
+HOMOGLYPH_RE = re.compile(_char_class(HOMOGLYPH_MAP))
+
+# Special whitespace characters, replaced with regular spaces
+WHITESPACE_MAP = {
+    '\u00A0': 'Non-Breaking Space',
+    '\u2000': 'En Quad',
+    '\u2001': 'Em Quad',
+    '\u2002': 'En Space',
+    '\u2003': 'Em Space',
+    '\u2004': 'Three-Per-Em Space',
+    '\u2005': 'Four-Per-Em Space',
+    '\u2006': 'Six-Per-Em Space',
+    '\u2007': 'Figure Space',
+    '\u2008': 'Punctuation Space',
+    '\u2009': 'Thin Space',
+    '\u200A': 'Hair Space',
+    '\u2028': 'Line Separator',
+    '\u2029': 'Paragraph Separator',
+    '\u205F': 'Medium Mathematical Space',
+    '\u3000': 'Ideographic Space'
+}
+
+# Control characters (tab, newline and carriage return excluded), removed from the text
+CONTROL_CODEPOINTS = [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), *range(0x7F, 0xA0)]
+
+# Invisible, special whitespace and control characters (disjoint classes) in one pattern
+WATERMARK_CHARS_RE = re.compile(
+    r'[\u200B\u200C\u200D\u202F\u2060\uFEFF'  # invisible
+    r'\u00A0\u2000-\u200A\u2028\u2029\u205F\u3000'  # whitespace
+    r'\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]'  # control
+)
+MULTIPLE_SPACES_RE = re.compile(r' {2,}')
+WORD_RE = re.compile(r'\S+')
+
+# Number of characters read at a time by clean_watermarks_stream
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Replaces homoglyphs, removes invisible characters and normalizes whitespace;
+# multiple spaces are detected in this text, before control characters are removed
+SPACING_TABLE = {
+    **{ord(char): replacement for char, (replacement, _) in HOMOGLYPH_MAP.items()},
+    **{ord(char): None for char in INVISIBLE_CHARS},
+    **{ord(char): ' ' for char in WHITESPACE_MAP},
+}
+CONTROL_TABLE = dict.fromkeys(CONTROL_CODEPOINTS)
+
+# One str.translate pass does all of the cleanup
+CLEANUP_TABLE = {**SPACING_TABLE, **CONTROL_TABLE}
+
+def _control_char_name(char):
+    """Get the name of a control character if available."""
+    try:
+        return unicodedata.name(char)
+    except ValueError:
+        return f"Control character (0x{ord(char):02X})"
+
+# Fixed (character, replacement, unicode, name, category) fields of every character matched by WATERMARK_CHARS_RE
+WATERMARK_CHAR_INFO = {
+    **{char: (char, None, f'U+{ord(char):04X}', name, 'Invisible Character')
+       for char, name in INVISIBLE_CHARS.items()},
+    **{char: (char, ' ', f'U+{ord(char):04X}', name, 'Whitespace Variation')
+       for char, name in WHITESPACE_MAP.items()},
+    **{chr(codepoint): (chr(codepoint), None, f'U+{codepoint:04X}', _control_char_name(chr(codepoint)),
+                        'Control Character')
+       for codepoint in CONTROL_CODEPOINTS},
+}
+
+class WatermarkRecord:
+    """Analysis of a single detected watermark, a lightweight record without a per-instance dict."""
+    
+    __slots__ = ('original_position', 'character', 'replacement', 'unicode', 'name', 'category',
+                 'context_range', 'preserved', 'adjusted_position')
+    
+    def __init__(self, original_position, character, replacement, unicode, name, category,
+                 context_range, preserved=False, adjusted_position=None):
+        self.original_position = original_position
+        self.character = character
+        self.replacement = replacement  # None if the character is removed
+        self.unicode = unicode
+        self.name = name
+        self.category = category
+        self.context_range = context_range
+        self.preserved = preserved
+        self.adjusted_position = adjusted_position
+    
+    def to_dict(self):
+        """Convert to a dict, leaving out the replacement of removed and the flag of unpreserved characters."""
+        record = {
+            'original_position': self.original_position,
+            'adjusted_position': self.adjusted_position,
+            'character': self.character,
+            'replacement': self.replacement,
+            'unicode': self.unicode,
+            'name': self.name,
+            'category': self.category,
+            'context_range': self.context_range,
+            'preserved': self.preserved
+        }
+        if self.replacement is None:
+            del record['replacement']
+        if not self.preserved:
+            del record['preserved']
+        return record
 
 def analyze_watermarks(text, preserve_multiple_spaces=True):
     """
@@ -18,277 +202,235 @@ def analyze_watermarks(text, preserve_multiple_spaces=True):
         - cleaned text
         - detailed statistics on removed watermarks
         - character-by-character analysis of removed elements
+    
+    Positions in the character analysis refer to the original text
+    ('original_position') and to the cleaned text ('adjusted_position').
+    Contexts are stored as index ranges into the original text
+    ('context_range'); use materialize_context to extract them.
     """
     original_text = text
-    watermark_stats = {}
-    character_analysis = []
-    
-    # Track position shifts as we remove characters
-    position_shift = 0
-    
-    # 1. Analyze invisible Unicode characters
-    invisible_chars = {
-        '\u200B': 'Zero Width Space',
-        '\u200C': 'Zero Width Non-Joiner',
-        '\u200D': 'Zero Width Joiner',
-        '\u202F': 'Narrow No-Break Space',
-        '\u2060': 'Word Joiner',
-        '\uFEFF': 'Zero Width No-Break Space'
-    }
     
-    invisible_counts = Counter()
+    # 1. Analyze invisible characters, whitespace variations and control characters in one scan
+    # Record detailed analysis, the per-character fields come precomputed
+    character_analysis = [
+        WatermarkRecord(match.start(), *WATERMARK_CHAR_INFO[match.group(0)], get_context(text, match.start()))
+        for match in WATERMARK_CHARS_RE.finditer(text)
+    ]
+    # Counted from the records, the text is not scanned a second time
+    watermark_counts = Counter(map(attrgetter('character'), character_analysis))
+    
+    # 2. Detect homoglyphs (characters that look like standard ones)
+    homoglyph_records = []
     
-    for match in re.finditer(r'[\u200B\u200C\u200D\u202F\u2060\uFEFF]', text):
+    # A single scan finds all homoglyphs together with their positions
+    for match in HOMOGLYPH_RE.finditer(text):
         char = match.group(0)
+        replacement, description = HOMOGLYPH_MAP[char]
         orig_pos = match.start()
-        invisible_counts[char] += 1
         
         # Record detailed analysis
-        character_analysis.append({
-            'original_position': orig_pos,
-            'adjusted_position': orig_pos - position_shift,
-            'character': char,
-            'unicode': f'U+{ord(char):04X}',
-            'name': invisible_chars.get(char, 'Unknown invisible character'),
-            'category': 'Invisible Character',
-            'context': get_context(text, orig_pos)
-        })
-    
-    # Update the text by removing invisible characters
-    invisible_chars_pattern = re.compile(r'[\u200B\u200C\u200D\u202F\u2060\uFEFF]')
-    text = invisible_chars_pattern.sub('', text)
+        homoglyph_records.append(WatermarkRecord(
+            orig_pos, char, replacement, f'U+{ord(char):04X}', description,
+            'Homoglyph Substitution', get_context(text, orig_pos)
+        ))
+    homoglyph_counts = Counter(map(attrgetter('character'), homoglyph_records))
+    
+    # Replace homoglyphs, remove invisible and control characters, normalize whitespace in a single pass
+    text = text.translate(CLEANUP_TABLE)
+    
+    # Map positions between the original and the cleaned text
+    # Records of each scan come in position order, so no sorting is needed
+    removed_positions = [item.original_position for item in character_analysis
+                         if item.category in ('Invisible Character', 'Control Character')]
+    invisible_positions = [item.original_position for item in character_analysis
+                           if item.category == 'Invisible Character']
+    for item in chain(character_analysis, homoglyph_records):
+        item.adjusted_position = item.original_position - bisect_left(removed_positions, item.original_position)
+    
+    # ANALYSIS ONLY: Detect multiple spaces but DO NOT replace them
+    multiple_spaces_count = 0
+    multiple_spaces_records = []
+    
+    # Spaces are looked for before control characters are removed, so that
+    # removing them never joins spaces into runs that were not in the input
+    if len(invisible_positions) == len(removed_positions):
+        spaced_text = text
+    else:
+        spaced_text = original_text.translate(SPACING_TABLE)
+    spaced_removed_positions = [pos - i for i, pos in enumerate(invisible_positions)]
+    
+    # Just analyze multiple spaces without replacing them
+    for match in MULTIPLE_SPACES_RE.finditer(spaced_text):
+        spaces = match.group(0)
+        spaced_pos = match.start()
+        orig_pos = spaced_pos + bisect_right(spaced_removed_positions, spaced_pos)
+        cleaned_pos = orig_pos - bisect_left(removed_positions, orig_pos)
+        multiple_spaces_count += 1
+        
+        # Record detailed analysis
+        multiple_spaces_records.append(WatermarkRecord(
+            orig_pos, spaces,
+            spaces,  # No replacement, we preserve the spaces
+            'N/A', f'Multiple Spaces ({len(spaces)} spaces)', 'Multiple Spaces',
+            get_context(original_text, orig_pos),
+            preserved=True, adjusted_position=cleaned_pos
+        ))
+    
+    watermark_stats = build_watermark_stats(watermark_counts, homoglyph_counts, multiple_spaces_count)
+    
+    # Calculate total modifications (excluding preserved multiple spaces)
+    total_modifications = sum(
+        value['total'] for value in watermark_stats.values()
+    ) - multiple_spaces_count
+    
+    char_difference = len(original_text) - len(text)
+    
+    # Merge the position-ordered records of all scans by original position
+    character_analysis = list(merge(character_analysis, homoglyph_records, multiple_spaces_records,
+                                    key=attrgetter('original_position')))
+    
+    # Add watermark density analysis
+    pattern_analysis = analyze_watermark_patterns(original_text, character_analysis)
+    
+    result = {
+        'text': text,
+        'stats': watermark_stats,
+        'total_modifications': total_modifications,
+        'char_difference': char_difference,
+        'original_length': len(original_text),
+        'cleaned_length': len(text),
+        'character_analysis': character_analysis,
+        'pattern_analysis': pattern_analysis,
+        'preserved_multiple_spaces': True
+    }
+    
+    return result
+
+def build_watermark_stats(watermark_counts, homoglyph_counts, multiple_spaces_count):
+    """Build per-category watermark statistics from character counts."""
+    # Split the combined invisible/whitespace/control counts by class, keeping first-occurrence order
+    invisible_counts = {char: count for char, count in watermark_counts.items() if char in INVISIBLE_CHARS}
+    whitespace_counts = {char: count for char, count in watermark_counts.items() if char in WHITESPACE_MAP}
+    control_chars_counts = {char: count for char, count in watermark_counts.items()
+                            if char not in INVISIBLE_CHARS and char not in WHITESPACE_MAP}
+    watermark_stats = {}
     
     if sum(invisible_counts.values()) > 0:
         watermark_stats["Invisible Characters"] = {
             'total': sum(invisible_counts.values()),
-            'details': {f"U+{ord(char):04X} ({invisible_chars[char]})": count 
+            'details': {f"U+{ord(char):04X} ({INVISIBLE_CHARS[char]})": count 
                        for char, count in invisible_counts.items()}
         }
-        position_shift += sum(invisible_counts.values())
-    
-    # 2. Detect and replace homoglyphs (characters that look like standard ones)
-    homoglyph_map = {
-        # Cyrillic letters that look like Latin
-        'а': ('a', 'Cyrillic small letter a'),
-        'е': ('e', 'Cyrillic small letter ie'),
-        'о': ('o', 'Cyrillic small letter o'),
-        'р': ('p', 'Cyrillic small letter er'),
-        'с': ('c', 'Cyrillic small letter es'),
-        'х': ('x', 'Cyrillic small letter ha'),
-        'В': ('B', 'Cyrillic capital letter ve'),
-        'Н': ('H', 'Cyrillic capital letter en'),
-        'М': ('M', 'Cyrillic capital letter em'),
-        'К': ('K', 'Cyrillic capital letter ka'),
-        
-        # Mathematical symbols that look like letters
-        '𝐚': ('a', 'Mathematical bold small a'),
-        '𝐛': ('b', 'Mathematical bold small b'),
-        '𝐀': ('A', 'Mathematical bold capital A'),
-        '𝐁': ('B', 'Mathematical bold capital B'),
-        '𝑎': ('a', 'Mathematical italic small a'),
-        '𝑏': ('b', 'Mathematical italic small b'),
-        '𝒂': ('a', 'Mathematical bold italic small a'),
-        '𝒃': ('b', 'Mathematical bold italic small b'),
-        
-        # Other common homoglyphs
-        'ɑ': ('a', 'Latin small letter alpha'),
-        'ℯ': ('e', 'Script small e'),
-        'ｉ': ('i', 'Fullwidth latin small letter i'),
-        'ｏ': ('o', 'Fullwidth latin small letter o'),
-    }
-    
-    homoglyph_counts = Counter()
-    
-    # We need to search for homoglyphs one by one to track their positions
-    for char, (replacement, description) in homoglyph_map.items():
-        for match in re.finditer(re.escape(char), text):
-            orig_pos = match.start()
-            homoglyph_counts[char] += 1
-            
-            # Record detailed analysis
-            character_analysis.append({
-                'original_position': orig_pos,
-                'adjusted_position': orig_pos - position_shift,
-                'character': char,
-                'replacement': replacement,
-                'unicode': f'U+{ord(char):04X}',
-                'name': description,
-                'category': 'Homoglyph Substitution',
-                'context': get_context(text, orig_pos)
-            })
-    
-    # Replace homoglyphs
-    for char, (replacement, _) in homoglyph_map.items():
-        text = text.replace(char, replacement)
     
     if sum(homoglyph_counts.values()) > 0:
         watermark_stats["Homoglyph Substitutions"] = {
             'total': sum(homoglyph_counts.values()),
-            'details': {f"U+{ord(char):04X} ({homoglyph_map[char][1]})": count 
-                       for char, count in homoglyph_counts.items()}
+            'details': {f"U+{ord(char):04X} ({description})": homoglyph_counts[char]
+                       for char, (_, description) in HOMOGLYPH_MAP.items() if char in homoglyph_counts}
         }
     
-    # 3. Analyze whitespace variations
-    whitespace_map = {
-        '\u00A0': 'Non-Breaking Space',
-        '\u2000': 'En Quad',
-        '\u2001': 'Em Quad',
-        '\u2002': 'En Space',
-        '\u2003': 'Em Space',
-        '\u2004': 'Three-Per-Em Space',
-        '\u2005': 'Four-Per-Em Space',
-        '\u2006': 'Six-Per-Em Space',
-        '\u2007': 'Figure Space',
-        '\u2008': 'Punctuation Space',
-        '\u2009': 'Thin Space',
-        '\u200A': 'Hair Space',
-        '\u2028': 'Line Separator',
-        '\u2029': 'Paragraph Separator',
-        '\u205F': 'Medium Mathematical Space',
-        '\u3000': 'Ideographic Space'
-    }
-    
-    whitespace_counts = Counter()
-    
-    # Find all special whitespace characters
-    for match in re.finditer(r'[\u00A0\u2000-\u200A\u2028\u2029\u205F\u3000]', text):
-        char = match.group(0)
-        orig_pos = match.start()
-        whitespace_counts[char] += 1
-        
-        # Record detailed analysis
-        character_analysis.append({
-            'original_position': orig_pos,
-            'adjusted_position': orig_pos - position_shift,
-            'character': char,
-            'replacement': ' ',
-            'unicode': f'U+{ord(char):04X}',
-            'name': whitespace_map.get(char, 'Special whitespace'),
-            'category': 'Whitespace Variation',
-            'context': get_context(text, orig_pos)
-        })
-    
-    # Replace special whitespace with regular spaces
-    whitespace_pattern = re.compile(r'[\u00A0\u2000-\u200A\u2028\u2029\u205F\u3000]')
-    text = whitespace_pattern.sub(' ', text)
-    
-    # ANALYSIS ONLY: Detect multiple spaces but DO NOT replace them
-    multiple_spaces_pattern = re.compile(r' {2,}')
-    multiple_spaces_count = 0
-    
-    # Just analyze multiple spaces without replacing them
-    for match in re.finditer(multiple_spaces_pattern, text):
-        spaces = match.group(0)
-        orig_pos = match.start()
-        multiple_spaces_count += 1
-        
-        # Record detailed analysis
-        character_analysis.append({
-            'original_position': orig_pos,
-            'adjusted_position': orig_pos - position_shift,
-            'character': spaces,
-            'replacement': spaces,  # No replacement, we preserve the spaces
-            'unicode': 'N/A',
-            'name': f'Multiple Spaces ({len(spaces)} spaces)',
-            'category': 'Multiple Spaces',
-            'context': get_context(text, orig_pos),
-            'preserved': True
-        })
-    
     if sum(whitespace_counts.values()) > 0 or multiple_spaces_count > 0:
         watermark_stats["Whitespace Variations"] = {
             'total': sum(whitespace_counts.values()) + multiple_spaces_count,
             'details': {
-                **{f"U+{ord(char):04X} ({whitespace_map[char]})": count 
+                **{f"U+{ord(char):04X} ({WHITESPACE_MAP[char]})": count 
                    for char, count in whitespace_counts.items()},
                 "Multiple spaces (preserved)": multiple_spaces_count
             }
         }
     
-    # 4. Detect control characters
-    control_chars_counts = Counter()
-    
-    for match in re.finditer(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', text):
-        char = match.group(0)
-        orig_pos = match.start()
-        control_chars_counts[char] += 1
-        
-        # Get character name if available
-        try:
-            char_name = unicodedata.name(char)
-        except ValueError:
-            char_name = f"Control character (0x{ord(char):02X})"
-        
-        # Record detailed analysis
-        character_analysis.append({
-            'original_position': orig_pos,
-            'adjusted_position': orig_pos - position_shift,
-            'character': char,
-            'unicode': f'U+{ord(char):04X}',
-            'name': char_name,
-            'category': 'Control Character',
-            'context': get_context(text, orig_pos)
-        })
-    
-    # Remove control characters
-    control_chars_pattern = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]')
-    text = control_chars_pattern.sub('', text)
-    
     if sum(control_chars_counts.values()) > 0:
         watermark_stats["Control Characters"] = {
             'total': sum(control_chars_counts.values()),
             'details': {f"U+{ord(char):04X}": count for char, count in control_chars_counts.items()}
         }
-        position_shift += sum(control_chars_counts.values())
     
-    # Calculate total modifications (excluding preserved multiple spaces)
-    preserved_count = sum(1 for item in character_analysis if item.get('preserved', False))
-    total_modifications = sum(
-        value['total'] for value in watermark_stats.values()
-    ) - preserved_count
+    return watermark_stats
+
+def clean_watermarks_stream(input_file, output_file, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Remove watermarks from a file chunk by chunk, keeping memory use bounded.
     
-    char_difference = len(original_text) - len(text)
+    Every watermark pattern matches a single character, so chunks are cleaned
+    independently; only trailing spaces are carried over to the next chunk so
+    that multiple spaces spanning a chunk boundary are counted once. Only
+    statistics are collected, there is no per-character or pattern analysis.
     
-    # Sort character analysis by original position
-    character_analysis.sort(key=lambda x: x['original_position'])
+    Args:
+        input_file: Input file path
+        output_file: Output file path
+        chunk_size: Number of characters read at a time
     
-    # Add watermark density analysis
-    pattern_analysis = analyze_watermark_patterns(original_text, character_analysis)
+    Returns:
+        Analysis result like analyze_watermarks, without the cleaned text
+    """
+    watermark_counts = Counter()
+    homoglyph_counts = Counter()
+    multiple_spaces_count = 0
+    original_length = 0
+    cleaned_length = 0
+    pending_spaces = ''
+    
+    with open(input_file, 'r', encoding='utf-8') as fin, open(output_file, 'w', encoding='utf-8') as fout:
+        for chunk in iter(lambda: fin.read(chunk_size), ''):
+            original_length += len(chunk)
+            watermark_chars = WATERMARK_CHARS_RE.findall(chunk)
+            watermark_counts.update(watermark_chars)
+            homoglyph_counts.update(HOMOGLYPH_RE.findall(chunk))
+            
+            spaced = pending_spaces + chunk.translate(SPACING_TABLE)
+            
+            # Hold back trailing spaces, they may continue in the next chunk
+            complete = spaced.rstrip(' ')
+            pending_spaces = spaced[len(complete):]
+            # Multiple spaces are counted before control characters are removed
+            multiple_spaces_count += len(MULTIPLE_SPACES_RE.findall(complete))
+            if any(ord(char) in CONTROL_TABLE for char in watermark_chars):
+                complete = complete.translate(CONTROL_TABLE)
+            cleaned_length += len(complete)
+            fout.write(complete)
+        
+        if len(pending_spaces) > 1:
+            multiple_spaces_count += 1
+        cleaned_length += len(pending_spaces)
+        fout.write(pending_spaces)
     
-    result = {
-        'text': text,
+    watermark_stats = build_watermark_stats(watermark_counts, homoglyph_counts, multiple_spaces_count)
+    
+    return {
         'stats': watermark_stats,
-        'total_modifications': total_modifications,
-        'char_difference': char_difference,
-        'character_analysis': character_analysis,
-        'pattern_analysis': pattern_analysis,
+        'total_modifications': sum(value['total'] for value in watermark_stats.values()) - multiple_spaces_count,
+        'char_difference': original_length - cleaned_length,
+        'original_length': original_length,
+        'cleaned_length': cleaned_length,
+        'character_analysis': [],
+        'pattern_analysis': {'patterns_detected': False},
         'preserved_multiple_spaces': True
     }
-    
-    return result
 
 def get_context(text, position, context_size=20):
-    """Extract text context around a specific position."""
+    """Locate the text context around a specific position as (start, position, end) indices."""
     start = max(0, position - context_size)
     end = min(len(text), position + context_size + 1)
-    
-    # Extract before and after parts
-    before = text[start:position]
-    after = text[position:end]
+    return (start, position, end)
+
+def materialize_context(text, context_range):
+    """Extract the context located by get_context from the text it was computed on."""
+    start, position, end = context_range
     
     return {
-        'before': before,
-        'after': after,
+        'before': text[start:position],
+        'after': text[position:end],
         'position_in_context': position - start
     }
 
 def analyze_watermark_patterns(text, character_analysis):
-    """Analyze potential watermark patterns in the text."""
+    """Analyze potential watermark patterns in the text, given the character analysis in position order."""
     if not character_analysis:
         return {'patterns_detected': False}
     
     # Filter out preserved elements for pattern analysis
-    analysis_items = [item for item in character_analysis if not item.get('preserved', False)]
+    analysis_items = [item for item in character_analysis if not item.preserved]
     
     if not analysis_items:
         return {'patterns_detected': False}
@@ -298,92 +440,82 @@ def analyze_watermark_patterns(text, character_analysis):
     # Check for character frequency patterns
     char_positions = {}
     for item in analysis_items:
-        char = item['unicode']
+        char = item.unicode
         if char not in char_positions:
             char_positions[char] = []
-        char_positions[char].append(item['original_position'])
+        char_positions[char].append(item.original_position)
     
     # Analyze intervals between watermarks
     interval_patterns = {}
     for char, positions in char_positions.items():
-        if len(positions) > 1:
-            # Calculate intervals
-            intervals = [positions[i+1] - positions[i] for i in range(len(positions)-1)]
+        total_intervals = len(positions) - 1
+        
+        # Check if intervals follow a pattern
+        if total_intervals > 2:
+            # Count intervals between consecutive positions without an intermediate list
+            interval_counts = Counter(map(sub, positions[1:], positions))
+            
+            # A 60% majority leaves room for at most 40% other distinct intervals
+            if len(interval_counts) > total_intervals * 0.4 + 1:
+                continue
             
-            # Check if intervals follow a pattern
-            if len(intervals) > 2:
-                # Look for consistent intervals
-                interval_counts = Counter(intervals)
-                most_common_interval, count = interval_counts.most_common(1)[0]
-                
-                if count >= len(intervals) * 0.6:  # 60% or more have the same interval
-                    interval_patterns[char] = {
-                        'common_interval': most_common_interval,
-                        'consistency': count / len(intervals),
-                        'count': count,
-                        'total_intervals': len(intervals)
-                    }
-                    results['patterns_detected'] = True
-    
-    # Check word or character position patterns
-    word_positions = []
-    current_word_idx = 0
-    current_char_idx = 0
-    
-    for i, char in enumerate(text):
-        if char.isspace() and not text[i-1].isspace() if i > 0 else False:
-            current_word_idx += 1
-            current_char_idx = 0
-            continue
+            # Look for consistent intervals
+            most_common_interval, count = interval_counts.most_common(1)[0]
             
-        if not char.isspace():
-            for item in analysis_items:
-                if item['original_position'] == i:
-                    word_positions.append({
-                        'word_index': current_word_idx,
-                        'char_index': current_char_idx,
-                        'unicode': item['unicode'],
-                        'category': item['category']
-                    })
-            current_char_idx += 1
+            if count >= total_intervals * 0.6:  # 60% or more have the same interval
+                interval_patterns[char] = {
+                    'common_interval': most_common_interval,
+                    'consistency': count / total_intervals,
+                    'count': count,
+                    'total_intervals': total_intervals
+                }
+                results['patterns_detected'] = True
+    
+    # Check word or character position patterns, as parallel word and character indices
+    word_indices = array('l')
+    char_indices = array('l')
+    
+    # Words are maximal non-whitespace runs; locate each watermark's run by bisection
+    word_starts = array('l')
+    word_ends = array('l')
+    for match in WORD_RE.finditer(text):
+        word_starts.append(match.start())
+        word_ends.append(match.end())
+    
+    for item in analysis_items:
+        position = item.original_position
+        word_idx = bisect_right(word_starts, position) - 1
+        if word_idx < 0 or position >= word_ends[word_idx]:
+            continue  # watermarks on whitespace belong to no word
+        word_indices.append(word_idx)
+        char_indices.append(position - word_starts[word_idx])
     
     # Check for positional patterns (e.g., always at the beginning of words)
-    if word_positions:
+    total_positions = len(char_indices)
+    if total_positions:
         position_patterns = {}
         
         # Check for first/last character patterns
-        first_char_count = sum(1 for p in word_positions if p['char_index'] == 0)
-        last_char_patterns = {}
+        first_char_count = char_indices.count(0)
         
-        # Group by word to check for last character
-        words_with_watermarks = {}
-        for pos in word_positions:
-            if pos['word_index'] not in words_with_watermarks:
-                words_with_watermarks[pos['word_index']] = []
-            words_with_watermarks[pos['word_index']].append(pos)
+        # Items are in position order, so the last character index seen for a word is its largest
+        last_char_indices = dict(zip(word_indices, char_indices))
+        last_char_count = sum(1 for word_idx, char_idx in zip(word_indices, char_indices)
+                              if last_char_indices[word_idx] == char_idx)
         
-        for word_idx, positions in words_with_watermarks.items():
-            max_char_idx = max(p['char_index'] for p in positions)
-            last_char_count = sum(1 for p in positions if p['char_index'] == max_char_idx)
-            
-            if last_char_count > 0:
-                if 'last_char' not in last_char_patterns:
-                    last_char_patterns['last_char'] = 0
-                last_char_patterns['last_char'] += last_char_count
-        
-        if first_char_count > len(word_positions) * 0.4:  # 40% threshold
+        if first_char_count > total_positions * 0.4:  # 40% threshold
             position_patterns['first_char'] = {
                 'count': first_char_count,
-                'total': len(word_positions),
-                'percentage': first_char_count / len(word_positions)
+                'total': total_positions,
+                'percentage': first_char_count / total_positions
             }
             results['patterns_detected'] = True
         
-        if last_char_patterns.get('last_char', 0) > len(word_positions) * 0.4:
+        if last_char_count > total_positions * 0.4:
             position_patterns['last_char'] = {
-                'count': last_char_patterns['last_char'],
-                'total': len(word_positions),
-                'percentage': last_char_patterns['last_char'] / len(word_positions)
+                'count': last_char_count,
+                'total': total_positions,
+                'percentage': last_char_count / total_positions
             }
             results['patterns_detected'] = True
     
@@ -396,11 +528,11 @@ def analyze_watermark_patterns(text, character_analysis):
     # Check for potential encoding patterns (e.g., binary or hex encoding)
     if len(analysis_items) >= 8:
         invisible_chars = [item for item in analysis_items 
-                          if item['category'] == 'Invisible Character']
+                          if item.category == 'Invisible Character']
         
         if len(invisible_chars) >= 8:
             # Check for binary pattern (e.g., 8 bits could encode ASCII)
-            char_types = [item['unicode'] for item in invisible_chars[:32]]  # First 32 chars
+            char_types = [item.unicode for item in invisible_chars[:32]]  # First 32 chars
             unique_chars = set(char_types)
             
             if len(unique_chars) == 2:
@@ -457,7 +589,57 @@ def evaluate_watermark_impact(result):
     
     return impact_analysis
 
-def generate_report(original_text, result, impact_analysis):
+# Fixed report texts, by impact level where they depend on it
+READABILITY_EXPLANATIONS = {
+    'Minimal': "The watermarks detected are unlikely to affect readability of the text for humans, " 
+               "but may interfere with machine processing or accessibility tools.",
+    'Medium': "The watermarks could affect readability in some contexts, particularly " 
+              "when copied to different platforms or processed by different software.",
+    'High': "The watermarks significantly impact readability or reliability of the text " 
+            "when processed by software or assistive technologies."
+}
+
+LEAKAGE_EXPLANATIONS = {
+    'Possible': "The watermarks may be tracking the origin or distribution of this text.",
+    'Likely': "The watermarks appear designed to encode identifying information about " 
+              "the source, recipient, or distribution path of the text.",
+    'High': "The watermarks contain sophisticated encoded data that could include " 
+            "personally identifiable information or other sensitive data."
+}
+
+BINARY_ENCODING_EXPLANATION = ("The pattern of invisible characters suggests a possible binary encoding scheme, " 
+                               "which could be embedding data within the text.")
+
+WATERMARKING_TECHNOLOGY_EXPLANATION = ("The patterns detected are consistent with modern text watermarking techniques " 
+                                       "commonly used for:\n"
+                                       "- Source identification\n"
+                                       "- Copy tracking\n"
+                                       "- User identification\n"
+                                       "- Data leakage prevention")
+
+PRESERVED_FORMATTING_EXPLANATION = ("Multiple spaces were detected but preserved in the output text. " 
+                                    "While these might be part of a watermarking strategy, they could also be " 
+                                    "intentional formatting, so they were not modified.")
+
+RISK_RECOMMENDATIONS = {
+    'Low': (
+        "- The watermarks detected are minimal and likely benign.",
+        "- No significant action necessary beyond removing the watermarks if desired."
+    ),
+    'Medium': (
+        "- Consider whether the source of this text is trustworthy.",
+        "- Be cautious about sharing sensitive information with the source.",
+        "- Consider using the cleaned version for further distribution."
+    ),
+    'High': (
+        "- Exercise caution with the source of this text.",
+        "- Do not share sensitive information with the source.",
+        "- Consider using alternative sources or platforms.",
+        "- Always use the cleaned version for any further distribution."
+    )
+}
+
+def generate_report(result, impact_analysis):
     """Generate a detailed human-readable report."""
     report = []
     
@@ -468,8 +650,8 @@ def generate_report(original_text, result, impact_analysis):
     # Add summary
     report.append("## Summary")
     report.append("")
-    report.append(f"- Original text length: {len(original_text)} characters")
-    report.append(f"- Cleaned text length: {len(result['text'])} characters")
+    report.append(f"- Original text length: {result['original_length']} characters")
+    report.append(f"- Cleaned text length: {result['cleaned_length']} characters")
     report.append(f"- Characters removed: {result['char_difference']}")
     
     # Calculate actual modifications (excluding preserved spaces)
@@ -537,8 +719,7 @@ def generate_report(original_text, result, impact_analysis):
         
         if result['pattern_analysis'].get('encoding_analysis', {}).get('possible_binary_encoding', False):
             report.append("### Possible Binary Encoding")
-            report.append("The pattern of invisible characters suggests a possible binary encoding scheme, " 
-                         "which could be embedding data within the text.")
+            report.append(BINARY_ENCODING_EXPLANATION)
             report.append("")
     
     # Add impact analysis
@@ -557,63 +738,31 @@ def generate_report(original_text, result, impact_analysis):
     
     if impact_analysis['readability_impact'] != 'None':
         report.append("**Readability Impact:**")
-        if impact_analysis['readability_impact'] == 'Minimal':
-            report.append("The watermarks detected are unlikely to affect readability of the text for humans, " 
-                         "but may interfere with machine processing or accessibility tools.")
-        elif impact_analysis['readability_impact'] == 'Medium':
-            report.append("The watermarks could affect readability in some contexts, particularly " 
-                         "when copied to different platforms or processed by different software.")
-        elif impact_analysis['readability_impact'] == 'High':
-            report.append("The watermarks significantly impact readability or reliability of the text " 
-                         "when processed by software or assistive technologies.")
+        if impact_analysis['readability_impact'] in READABILITY_EXPLANATIONS:
+            report.append(READABILITY_EXPLANATIONS[impact_analysis['readability_impact']])
         report.append("")
     
     if impact_analysis['information_leakage'] != 'None':
         report.append("**Information Leakage:**")
-        if impact_analysis['information_leakage'] == 'Possible':
-            report.append("The watermarks may be tracking the origin or distribution of this text.")
-        elif impact_analysis['information_leakage'] == 'Likely':
-            report.append("The watermarks appear designed to encode identifying information about " 
-                         "the source, recipient, or distribution path of the text.")
-        elif impact_analysis['information_leakage'] == 'High':
-            report.append("The watermarks contain sophisticated encoded data that could include " 
-                         "personally identifiable information or other sensitive data.")
+        if impact_analysis['information_leakage'] in LEAKAGE_EXPLANATIONS:
+            report.append(LEAKAGE_EXPLANATIONS[impact_analysis['information_leakage']])
         report.append("")
     
     if result['pattern_analysis']['patterns_detected']:
         report.append("**Watermarking Technology:**")
-        report.append("The patterns detected are consistent with modern text watermarking techniques " 
-                     "commonly used for:\n"
-                     "- Source identification\n"
-                     "- Copy tracking\n"
-                     "- User identification\n"
-                     "- Data leakage prevention")
+        report.append(WATERMARKING_TECHNOLOGY_EXPLANATION)
         report.append("")
     
     # Note about preserved formatting
     if result.get('preserved_multiple_spaces'):
         report.append("**Preserved Formatting:**")
-        report.append("Multiple spaces were detected but preserved in the output text. " 
-                     "While these might be part of a watermarking strategy, they could also be " 
-                     "intentional formatting, so they were not modified.")
+        report.append(PRESERVED_FORMATTING_EXPLANATION)
         report.append("")
     
     # Add recommendations
     report.append("## Recommendations")
     report.append("")
-    
-    if impact_analysis['risk_level'] == 'Low':
-        report.append("- The watermarks detected are minimal and likely benign.")
-        report.append("- No significant action necessary beyond removing the watermarks if desired.")
-    elif impact_analysis['risk_level'] == 'Medium':
-        report.append("- Consider whether the source of this text is trustworthy.")
-        report.append("- Be cautious about sharing sensitive information with the source.")
-        report.append("- Consider using the cleaned version for further distribution.")
-    elif impact_analysis['risk_level'] == 'High':
-        report.append("- Exercise caution with the source of this text.")
-        report.append("- Do not share sensitive information with the source.")
-        report.append("- Consider using alternative sources or platforms.")
-        report.append("- Always use the cleaned version for any further distribution.")
+    report.extend(RISK_RECOMMENDATIONS.get(impact_analysis['risk_level'], ()))
     
     report.append("")
     report.append("---")
@@ -622,6 +771,118 @@ def generate_report(original_text, result, impact_analysis):
 
 
 
+def process_file(input_file, output_file, report_file=None, json_file=None, modify_spaces=False, stream=False):
+    """
+    Clean a text file and save the requested analysis outputs.
+    
+    Args:
+        input_file: Input file path
+        output_file: Output file path for the cleaned text
+        report_file: Path to save the markdown report, or None
+        json_file: Path to save the analysis data in JSON format, or None
+        modify_spaces: If True, multiple spaces will be collapsed to single spaces
+        stream: If True, clean the file in chunks with bounded memory (statistics only)
+    
+    Returns:
+        Tuple of the analysis result and the impact analysis
+    """
+    if stream:
+        # Clean chunk by chunk straight into the output file
+        result = clean_watermarks_stream(input_file, output_file)
+    else:
+        # Read input file
+        with open(input_file, 'r', encoding='utf-8') as f:
+            original_text = f.read()
+        
+        # Process the text
+        result = analyze_watermarks(original_text, preserve_multiple_spaces=not modify_spaces)
+        
+        # Write to output file
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(result['text'])
+    
+    # Evaluate impact
+    impact_analysis = evaluate_watermark_impact(result)
+    
+    # Generate and save report if requested
+    if report_file:
+        report_text = generate_report(result, impact_analysis)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(report_text)
+    
+    # Save JSON data if requested
+    if json_file:
+        # Prepare JSON-safe data (remove context ranges to reduce size)
+        json_data = {
+            'stats': result['stats'],
+            'total_modifications': result['total_modifications'],
+            'char_difference': result['char_difference'],
+            'pattern_analysis': result['pattern_analysis'],
+            'impact_analysis': impact_analysis,
+            'preserved_multiple_spaces': result.get('preserved_multiple_spaces', False),
+            'character_analysis': [{k: v for k, v in item.to_dict().items() if k != 'context_range'} 
+                                 for item in result['character_analysis']]
+        }
+        
+        if orjson is not None:
+            with open(json_file, 'wb') as f:
+                f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, indent=2)
+    
+    return result, impact_analysis
+
+def _process_batch_file(input_file, output_file, report_file, json_file, modify_spaces, stream):
+    """Process one file of a batch in a worker process, returning a short summary or the error."""
+    try:
+        for path in (output_file, report_file, json_file):
+            if path:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        result, impact_analysis = process_file(input_file, output_file, report_file, json_file,
+                                               modify_spaces, stream)
+        return result['total_modifications'], impact_analysis['risk_level'], None
+    except Exception as e:
+        return None, None, str(e)
+
+def _process_batch_files(jobs, input_files, *file_args):
+    """Process batch files in input order, in parallel worker processes if jobs > 1."""
+    if jobs > 1 and len(input_files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(_process_batch_file, input_files, *file_args, chunksize=8)
+    else:
+        yield from map(_process_batch_file, input_files, *file_args)
+
+def process_directory(args):
+    """Clean all files matching the glob pattern in the input directory, in parallel."""
+    input_files = sorted(
+        path for path in glob.glob(os.path.join(args.input_dir, args.glob), recursive=True)
+        if os.path.isfile(path)
+    )
+    if not input_files:
+        print(f"No files matching '{args.glob}' in: {args.input_dir}")
+        return 0
+    
+    # Outputs mirror the layout of the input directory
+    relative_paths = [os.path.relpath(path, args.input_dir) for path in input_files]
+    output_files = [os.path.join(args.output_dir, path) for path in relative_paths]
+    report_files = [os.path.join(args.report, path + '.md') if args.report else None for path in relative_paths]
+    json_files = [os.path.join(args.json, path + '.json') if args.json else None for path in relative_paths]
+    
+    print(f"Processing {len(input_files)} files from: {args.input_dir}")
+    exit_code = 0
+    summaries = _process_batch_files(args.jobs, input_files, output_files, report_files, json_files,
+                                     repeat(args.modify_spaces), repeat(args.stream))
+    for input_file, (total_modifications, risk_level, error) in zip(input_files, summaries):
+        if error is not None:
+            print(f"Error processing {input_file}: {error}", file=sys.stderr)
+            exit_code = 1
+        else:
+            print(f"- {input_file}: {total_modifications} modifications, risk level {risk_level}")
+    
+    print(f"\nCleaned files saved to: {args.output_dir}")
+    return exit_code
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(
@@ -630,23 +891,25 @@ def main():
     
     parser.add_argument(
         "input_file", 
+        nargs="?",
         help="Input file path"
     )
     
     parser.add_argument(
         "output_file",
+        nargs="?",
         help="Output file path"
     )
     
     parser.add_argument(
         "--report",
-        help="Path to save detailed analysis report (markdown format)",
+        help="Path to save detailed analysis report (markdown format); a directory with --input-dir",
         default=None
     )
     
     parser.add_argument(
         "--json",
-        help="Path to save analysis data in JSON format",
+        help="Path to save analysis data in JSON format; a directory with --input-dir",
         default=None
     )
     
@@ -656,53 +919,62 @@ def main():
         help="If specified, multiple spaces will be collapsed to single spaces"
     )
     
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Clean the file in chunks with bounded memory (statistics only, no per-character or pattern analysis)"
+    )
+    
+    parser.add_argument(
+        "--input-dir",
+        help="Clean all files matching --glob in this directory instead of a single input file",
+        default=None
+    )
+    
+    parser.add_argument(
+        "--glob",
+        help="Glob pattern selecting files in --input-dir, '**' matches subdirectories (default: *.txt)",
+        default="*.txt"
+    )
+    
+    parser.add_argument(
+        "--output-dir",
+        help="Directory to save the cleaned files to, required with --input-dir",
+        default=None
+    )
+    
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes with --input-dir, 1 or less runs in-process (default: number of CPUs)"
+    )
+    
     args = parser.parse_args()
     
+    if args.input_dir:
+        if not args.output_dir:
+            parser.error("--output-dir is required with --input-dir")
+        if not os.path.isdir(args.input_dir):
+            parser.error(f"--input-dir is not a directory: {args.input_dir}")
+        return process_directory(args)
+    if not args.input_file or not args.output_file:
+        parser.error("input_file and output_file are required without --input-dir")
+    
     try:
-        # Read input file
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            original_text = f.read()
-        
-        # Process the text
         print(f"Processing file: {args.input_file}")
-        result = analyze_watermarks(original_text, preserve_multiple_spaces=not args.modify_spaces)
-        
-        # Evaluate impact
-        impact_analysis = evaluate_watermark_impact(result)
-        
-        # Write to output file
-        with open(args.output_file, 'w', encoding='utf-8') as f:
-            f.write(result['text'])
-        
-        # Generate and save report if requested
+        result, impact_analysis = process_file(args.input_file, args.output_file, args.report, args.json,
+                                               args.modify_spaces, args.stream)
         if args.report:
-            report_text = generate_report(original_text, result, impact_analysis)
-            with open(args.report, 'w', encoding='utf-8') as f:
-                f.write(report_text)
             print(f"Detailed report saved to: {args.report}")
-        
-        # Save JSON data if requested
         if args.json:
-            # Prepare JSON-safe data (remove context to reduce size)
-            json_data = {
-                'stats': result['stats'],
-                'total_modifications': result['total_modifications'],
-                'char_difference': result['char_difference'],
-                'pattern_analysis': result['pattern_analysis'],
-                'impact_analysis': impact_analysis,
-                'preserved_multiple_spaces': result.get('preserved_multiple_spaces', False),
-                'character_analysis': [{k: v for k, v in item.items() if k != 'context'} 
-                                     for item in result['character_analysis']]
-            }
-            
-            with open(args.json, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2)
             print(f"Analysis data saved to: {args.json}")
         
         # Report results to console
         print("\nWatermark Analysis Results:")
-        print(f"- Original size: {len(original_text)} characters")
-        print(f"- Cleaned size: {len(result['text'])} characters")
+        print(f"- Original size: {result['original_length']} characters")
+        print(f"- Cleaned size: {result['cleaned_length']} characters")
         print(f"- Characters removed: {result['char_difference']}")
         if result.get('preserved_multiple_spaces'):
             print("- Multiple spaces were preserved")
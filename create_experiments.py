@@ -1,10 +1,43 @@
 import re, sys, os
 import json
 import itertools
+import math
 import argparse
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+import tempfile
 import traceback
+from collections import ChainMap, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to json
+    orjson = None
+
+
+# Number of configurations handed to the worker threads at a time
+JOB_BATCH_SIZE = 256
+
+# Number of configurations between progress updates without --verbose
+PROGRESS_INTERVAL = 128
+
+# Commands running generated files in the execution script, by file extension
+EXECUTION_COMMANDS = {".sbatch": "sbatch", ".sh": "bash", ".py": "python"}
+
+# mkstemp creates owner-only files, generated files get the mode open() would give
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+# Placeholders in templates, in $PLACEHOLDER_NAME format
+PLACEHOLDER_RE = re.compile(r"\$([A-Z_][A-Z0-9_]*)")
+
+# Characters replaced with underscores when sanitizing names
+FILENAME_UNSAFE_TABLE = str.maketrans(dict.fromkeys('./\\ :*?"<>|', "_"))
+IDENTIFIER_UNSAFE_RE = re.compile(r"[^a-zA-Z0-9_-]")
+UNDERSCORES_RE = re.compile(r"_+")
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -93,6 +126,14 @@ NOTES:
         help="Show what would be generated without creating files",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of threads writing files (default: number of CPUs)",
+    )
+
     parser.add_argument(
         "-d",
         "--delimiter",
@@ -127,8 +168,16 @@ def load_config(
     print_subsection("Loading Configuration")
 
     try:
-        with open(config_path, "r") as f:
-            config = json.load(f)
+        with open(config_path, "rb") as f:
+            data = f.read()
+        config = None
+        if orjson is not None:
+            try:
+                config = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass  # json accepts a bit more (e.g. NaN) and reports the error
+        if config is None:
+            config = json.loads(data)
 
         print(f"✓ Successfully loaded config from: {config_path}")
 
@@ -187,7 +236,7 @@ def load_config(
 
         return config
 
-    except FileNotFoundError:
+    except (FileNotFoundError, IsADirectoryError):
         print(f"✗ Error: Config file '{config_path}' not found!")
         sys.exit(1)
     except json.JSONDecodeError as e:
@@ -217,16 +266,13 @@ def load_template(template_path: str, verbose: bool = False) -> str:
         )
 
         # Detect placeholders in template (format: $PLACEHOLDER_NAME)
-        placeholders = re.findall(r"\$([A-Z_][A-Z0-9_]*)", template)
-        unique_placeholders = set(placeholders)
-
-        if unique_placeholders:
-            print(f"  Detected {len(unique_placeholders)} unique placeholder(s):")
-            for ph in sorted(unique_placeholders):
-                count = placeholders.count(ph)
-                print(f"    - ${ph} (used {count} time(s))")
-        else:
+        if not PLACEHOLDER_RE.search(template):
             print(f"  ⚠ Warning: No placeholders detected in template")
+        elif verbose:
+            placeholder_counts = Counter(PLACEHOLDER_RE.findall(template))
+            print(f"  Detected {len(placeholder_counts)} unique placeholder(s):")
+            for ph, count in sorted(placeholder_counts.items()):
+                print(f"    - ${ph} (used {count} time(s))")
 
         if verbose and template.strip():
             print(f"  First 200 characters of template:")
@@ -234,7 +280,7 @@ def load_template(template_path: str, verbose: bool = False) -> str:
 
         return template
 
-    except FileNotFoundError:
+    except (FileNotFoundError, IsADirectoryError):
         print(f"✗ Error: Template file '{template_path}' not found!")
         sys.exit(1)
     except Exception as e:
@@ -243,20 +289,68 @@ def load_template(template_path: str, verbose: bool = False) -> str:
         sys.exit(1)
 
 
-def generate_grid_combinations(grid_params: Dict[str, List]) -> List[Dict[str, Any]]:
-    """Generate all combinations from grid search parameters."""
+def compile_template(
+    template: str, names: Iterable[str]
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Split template into (literal, placeholder name) segments for the given names.
+    The last segment holds the remaining literal with None as placeholder name.
+    """
+    # Longest names first so that e.g. $LR_MIN is not taken for $LR followed by "_MIN"
+    names = sorted(set(names), key=len, reverse=True)
+    placeholder_re = re.compile("\\$(" + "|".join(map(re.escape, names)) + ")")
+
+    # Names are interned so that mapping lookups mostly compare by identity
+    segments = []
+    last = 0
+    for match in placeholder_re.finditer(template):
+        segments.append((template[last : match.start()], sys.intern(match.group(1))))
+        last = match.end()
+    segments.append((template[last:], None))
+    return segments
+
+
+def fold_segments(
+    segments: List[Tuple[str, Optional[str]]], values: Dict[str, str]
+) -> List[Tuple[str, Optional[str]]]:
+    """Substitute placeholders with values known up front into the literals."""
+    folded = []
+    parts = []
+    for literal, name in segments:
+        parts.append(literal)
+        if name in values:
+            parts.append(values[name])
+        else:
+            folded.append(("".join(parts), name))
+            parts = []
+    return folded
+
+
+def render_template(
+    segments: List[Tuple[str, Optional[str]]], mapping: Dict[str, str]
+) -> str:
+    """Join template segments, leaving placeholders without a value as they are."""
+    parts = []
+    for literal, name in segments:
+        parts.append(literal)
+        if name is not None:
+            parts.append(mapping.get(name, "$" + name))
+    return "".join(parts)
+
+
+def generate_grid_combinations(
+    grid_params: Dict[str, List]
+) -> Iterator[Dict[str, Any]]:
+    """Generate all combinations from grid search parameters, one at a time."""
     if not grid_params:
-        return []
+        return
 
     keys = list(grid_params.keys())
     values = list(grid_params.values())
 
     try:
-        combinations = []
         for combo in itertools.product(*values):
-            combinations.append(dict(zip(keys, combo)))
-
-        return combinations
+            yield dict(zip(keys, combo))
 
     except Exception as e:
         print(f"✗ Error generating grid combinations: {e}")
@@ -264,13 +358,15 @@ def generate_grid_combinations(grid_params: Dict[str, List]) -> List[Dict[str, A
         sys.exit(1)
 
 
+# Grid values repeat across many configurations, so sanitized results are cached
+@lru_cache(maxsize=4096)
 def sanitize_for_identifier(value: str) -> str:
     """Sanitize a value for use in identifier string."""
     sanitized = str(value)
     # Replace problematic characters with underscores
-    sanitized = re.sub(r"[^a-zA-Z0-9_-]", "_", sanitized)
+    sanitized = IDENTIFIER_UNSAFE_RE.sub("_", sanitized)
     # Remove consecutive underscores
-    sanitized = re.sub(r"_+", "_", sanitized)
+    sanitized = UNDERSCORES_RE.sub("_", sanitized)
     # Remove leading/trailing underscores
     sanitized = sanitized.strip("_")
     return sanitized
@@ -279,141 +375,207 @@ def sanitize_for_identifier(value: str) -> str:
 CURRENT_TIME = datetime.now()
 
 
+# Date fields in identifier prefixes, formatted once for the whole run
+DATETIME_FIELDS = {
+    "$DATETIME0": CURRENT_TIME.strftime("%Y-%m-%d_%H:%M:%S"),
+    "$DATETIME1": CURRENT_TIME.strftime("%Y%m%d-%H:%M:%S"),
+    "$DATETIME": CURRENT_TIME.strftime("%Y%m%d%H%M%S"),
+    "$DATE0": CURRENT_TIME.strftime("%Y-%m-%d"),
+    "$DATE1": CURRENT_TIME.strftime("%Y%m%d"),
+    "$DATE": CURRENT_TIME.strftime("%Y%m%d"),
+}
+DATETIME_FIELD_RE = re.compile(r"\$DATE(?:TIME)?[01]?")
+
+
 def parse_hardcoded_fields(prefix, filename):
-    prefix = prefix.replace("$DATETIME0", CURRENT_TIME.strftime("%Y-%m-%d_%H:%M:%S"))
-    prefix = prefix.replace("$DATETIME1", CURRENT_TIME.strftime("%Y%m%d-%H:%M:%S"))
-    prefix = prefix.replace("$DATETIME", CURRENT_TIME.strftime("%Y%m%d%H%M%S"))
-    prefix = prefix.replace("$DATE0", CURRENT_TIME.strftime("%Y-%m-%d"))
-    prefix = prefix.replace("$DATE1", CURRENT_TIME.strftime("%Y%m%d"))
-    prefix = prefix.replace("$DATE", CURRENT_TIME.strftime("%Y%m%d"))
+    prefix = DATETIME_FIELD_RE.sub(lambda m: DATETIME_FIELDS[m.group(0)], prefix)
     prefix = prefix.replace("$FILE", filename)
     return prefix
 
 
-def generate_identifier(
-    params: Dict[str, Any], prefix: str = "", filename: str = ""
-) -> str:
-    """
-    Generate $IDENTIFIER value from parameters.
-    Format: prefix_PARAM1_VALUE1_PARAM2_VALUE2_...
-    """
-    parts = []
-
-    # Add prefix if provided
-    if prefix:
-        prefix = parse_hardcoded_fields(prefix, filename)
-        # prefix = sanitize_for_identifier(prefix)
-        parts.append(prefix)
-
-    # Add parameter key-value pairs
-    for key, value in sorted(params.items()):
-        if key != "name":  # Skip 'name' field
-            sanitized_key = sanitize_for_identifier(key)
-            sanitized_value = sanitize_for_identifier(str(value))
-            parts.append(f"{sanitized_key}_{sanitized_value}")
-
-    return "_".join(parts) if parts else "default"
+def format_replacements(
+    replacements: Dict[str, Any], string_delimiter: Optional[str] = '"'
+) -> Dict[str, str]:
+    """Convert replacement values to the text substituted into the template."""
+    mapping = {}
+    for key, value in replacements.items():
+        key = sys.intern(key)
+        if isinstance(value, str):
+            mapping[key] = string_delimiter + value + string_delimiter
+        else:
+            mapping[key] = str(value)
+    return mapping
 
 
 def apply_replacements(
-    template: str,
+    segments: List[Tuple[str, Optional[str]]],
     replacements: Dict[str, Any],
     identifier: str,
     config_name: Optional[str] = None,
     verbose: bool = False,
     string_delimiter: Optional[str] = '"',
-) -> str:
-    """Apply replacements to template string using $PLACEHOLDER format."""
+    fixed_mapping: Optional[Dict[str, str]] = None,
+    messages: Optional[List[str]] = None,
+) -> Optional[str]:
+    """
+    Apply replacements to the compiled template using $PLACEHOLDER format.
+    fixed_mapping holds already formatted values shared by all configurations,
+    replacements take precedence over it.
+    If messages is given, warnings and errors are appended to it instead of
+    printed, and an error returns None instead of exiting.
+    """
+    report = print if messages is None else messages.append
     try:
-        result = template
+        mapping = format_replacements(replacements, string_delimiter)
+        mapping["RAWIDENTIFIER"] = identifier
+        mapping["IDENTIFIER"] = string_delimiter + identifier + string_delimiter
+        if fixed_mapping:
+            mapping = ChainMap(mapping, fixed_mapping)
 
-        # First, replace $IDENTIFIER
-        result = result.replace("$RAWIDENTIFIER", identifier)
-        result = result.replace(
-            "$IDENTIFIER", string_delimiter + identifier + string_delimiter
-        )
-
-        # Then replace all other placeholders
-        for key, value in replacements.items():
-            if isinstance(value, str):
-                str_value = string_delimiter + value + string_delimiter
-            else:
-                str_value = str(value)
-            placeholder = f"${key}"
-            result = result.replace(placeholder, str_value)
+        result = render_template(segments, mapping)
 
         if verbose:
             # Check for unreplaced placeholders
-            remaining = re.findall(r"\$([A-Z_][A-Z0-9_]*)", result)
+            remaining = PLACEHOLDER_RE.findall(result)
             if remaining:
                 unique_remaining = set(remaining)
                 config_info = f" in config '{config_name}'" if config_name else ""
-                print(
+                report(
                     f"  ⚠ Warning{config_info}: {len(unique_remaining)} placeholder(s) not replaced:"
                 )
                 for ph in sorted(unique_remaining):
-                    print(f"    - ${ph}")
+                    report(f"    - ${ph}")
 
         return result
 
     except Exception as e:
         config_info = f" for config '{config_name}'" if config_name else ""
-        print(f"✗ Error applying replacements{config_info}: {e}")
+        report(f"✗ Error applying replacements{config_info}: {e}")
+        if messages is not None:
+            messages.append(traceback.format_exc().rstrip("\n"))
+            return None
         traceback.print_exc()
         sys.exit(1)
 
 
+@lru_cache(maxsize=4096)
 def sanitize_for_filename(value: str) -> str:
     """Sanitize a value to be safe for use in filenames."""
-    sanitized = str(value)
-    sanitized = sanitized.replace(".", "_")
-    sanitized = sanitized.replace("/", "_")
-    sanitized = sanitized.replace("\\", "_")
-    sanitized = sanitized.replace(" ", "_")
-    sanitized = sanitized.replace(":", "_")
-    sanitized = sanitized.replace("*", "_")
-    sanitized = sanitized.replace("?", "_")
-    sanitized = sanitized.replace('"', "_")
-    sanitized = sanitized.replace("<", "_")
-    sanitized = sanitized.replace(">", "_")
-    sanitized = sanitized.replace("|", "_")
-    sanitized = re.sub(r"_+", "_", sanitized)
+    sanitized = str(value).translate(FILENAME_UNSAFE_TABLE)
+    sanitized = UNDERSCORES_RE.sub("_", sanitized)
     return sanitized
 
 
-def generate_filename(
-    prefix: str, params: Dict[str, Any], counter: int, config_name: Optional[str] = None
-) -> str:
-    """Generate a descriptive filename from parameters."""
-    parts = [prefix, str(counter)]
+# All grid configurations share one key order, so it is sorted only once
+@lru_cache(maxsize=256)
+def sorted_key_order(keys: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Positions of the keys other than 'name', ordered by key."""
+    keys = [key for key in keys if key != "name"]
+    return tuple(sorted(range(len(keys)), key=keys.__getitem__))
+
+
+def build_names(
+    file_prefix: str,
+    id_prefix: str,
+    params: Dict[str, Any],
+    counter: int,
+    config_name: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Generate the filename and the $IDENTIFIER value in one pass over parameters.
+    Filename parts follow the parameter order, identifier parts are sorted by key.
+    """
+    parts = [file_prefix, str(counter)]
     filename_prefix = "_".join(parts)
 
     # Add config name if provided
     if config_name:
         parts.append(sanitize_for_filename(config_name))
 
-    # Add parameter values
-    if params:
-        for key, value in params.items():
-            if key != "name":  # Skip 'name' field
-                sanitized_key = sanitize_for_filename(key)
-                sanitized_value = sanitize_for_filename(str(value))
-                parts.append(f"{sanitized_key}_{sanitized_value}")
+    # Add parameter values, sanitizing each pair for both uses at once
+    id_parts = []
+    for key, value in params.items():
+        if key != "name":  # Skip 'name' field
+            value = str(value)
+            sanitized_key = sanitize_for_filename(key)
+            sanitized_value = sanitize_for_filename(value)
+            parts.append(f"{sanitized_key}_{sanitized_value}")
+            sanitized_key = sanitize_for_identifier(key)
+            sanitized_value = sanitize_for_identifier(value)
+            id_parts.append(f"{sanitized_key}_{sanitized_value}")
+
+    # Add prefix if provided
+    identifier_parts = []
+    if id_prefix:
+        identifier_parts.append(parse_hardcoded_fields(id_prefix, filename_prefix))
+    identifier_parts.extend(map(id_parts.__getitem__, sorted_key_order(tuple(params))))
+    identifier = "_".join(identifier_parts) if identifier_parts else "default"
 
-    return filename_prefix, "_".join(parts)
+    return "_".join(parts), identifier
 
 
-def write_file_safely(path: str, content: str) -> bool:
-    """Write file with error handling."""
+def write_file_safely(
+    path: str, content: str, messages: Optional[List[str]] = None
+) -> bool:
+    """
+    Write file atomically with error handling, never leaving partial files.
+    If messages is given, errors are appended to it instead of printed.
+    """
     try:
-        with open(path, "w") as f:
-            f.write(content)
+        # Encode once and hand the bytes over in a single write, bypassing text I/O
+        data = content.encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path) or ".", prefix=".gen_"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp_path, FILE_MODE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         return True
     except Exception as e:
-        print(f"  ✗ Error writing file '{path}': {e}")
+        message = f"  ✗ Error writing file '{path}': {e}"
+        if messages is None:
+            print(message)
+        else:
+            messages.append(message)
         return False
 
 
+def emit_file(
+    output_path: str,
+    segments: List[Tuple[str, Optional[str]]],
+    replacements: Dict[str, Any],
+    identifier: str,
+    config_name: Optional[str] = None,
+    verbose: bool = False,
+    string_delimiter: Optional[str] = '"',
+    fixed_mapping: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[bool], List[str]]:
+    """
+    Render the template for one configuration and write it to output_path.
+    Returns whether the file was written (None if rendering failed) and the
+    messages to show for it, so that the caller prints them in order.
+    """
+    messages = []
+    output_content = apply_replacements(
+        segments,
+        replacements,
+        identifier,
+        config_name,
+        verbose,
+        string_delimiter,
+        fixed_mapping,
+        messages,
+    )
+    if output_content is None:
+        return None, messages
+    return write_file_safely(output_path, output_content, messages), messages
+
+
 def main():
     # Parse arguments
     parser = create_parser()
@@ -428,15 +590,6 @@ def main():
     print(f"Template file: {args.template}")
     print(f"Config file: {args.config}")
 
-    # Validate inputs exist
-    if not os.path.isfile(args.template):
-        print(f"✗ Error: Template file '{args.template}' not found!")
-        sys.exit(1)
-
-    if not os.path.isfile(args.config):
-        print(f"✗ Error: Config file '{args.config}' not found!")
-        sys.exit(1)
-
     # Load configuration and template
     config = load_config(
         args.config,
@@ -479,7 +632,8 @@ def main():
     print(f"Output file extension: {file_extension}")
 
     # Generate configurations
-    all_configs = []
+    predefined_configs = []
+    grid_configs = iter(())
 
     # Add predefined configs
     if config["predefined_configs"]:
@@ -490,12 +644,16 @@ def main():
             config_name = preset.get("name", f"preset_{idx}")
             # Remove 'name' from parameters if present
             params = {k: v for k, v in preset.items() if k != "name"}
-            all_configs.append(("predefined", config_name, params))
+            # Predefined configs come first, so their names are known already
+            names = build_names(
+                config["output_prefix"], config["id"], params, idx, config_name
+            )
+            predefined_configs.append(("predefined", config_name, params, names))
 
-            identifier = generate_identifier(params, config["id"])
-            print(f"  {idx}. {config_name}")
-            print(f"     Parameters: {params}")
-            print(f"     $IDENTIFIER: {identifier}")
+            if args.verbose:
+                print(f"  {idx}. {config_name}")
+                print(f"     Parameters: {params}")
+                print(f"     $IDENTIFIER: {names[1]}")
 
     # Add grid search configs
     if config["grid_search"]:
@@ -504,15 +662,51 @@ def main():
         for key, values in config["grid_search"].items():
             print(f"  - ${key}: {values} ({len(values)} values)")
 
-        grid_combinations = generate_grid_combinations(config["grid_search"])
-        print(f"Total grid combinations: {len(grid_combinations)}")
+        # Combinations are generated lazily while files are written
+        total_grid = math.prod(len(values) for values in config["grid_search"].values())
+        print(f"Total grid combinations: {total_grid}")
 
-        for params in grid_combinations:
-            all_configs.append(("grid", None, params))
+        grid_configs = (
+            ("grid", None, params, None)
+            for params in generate_grid_combinations(config["grid_search"])
+        )
 
-    total_configs = len(all_configs)
+    all_configs = itertools.chain(predefined_configs, grid_configs)
+    total_configs = len(predefined_configs) + (
+        total_grid if config["grid_search"] else 0
+    )
     print(f"\nTotal configurations to generate: {total_configs}")
 
+    # Split the template at every placeholder any configuration can replace
+    variable_names = {"IDENTIFIER", "RAWIDENTIFIER", *config["grid_search"]}
+    for preset in config["predefined_configs"]:
+        variable_names.update(key for key in preset if key != "name")
+    segments = compile_template(
+        template, variable_names | config["replacements"].keys()
+    )
+
+    # Fixed replacements are formatted once, config parameters are layered on top
+    fixed_mapping = format_replacements(
+        config["replacements"], config["string_delimiter"]
+    )
+
+    # Values shared by all configurations are written into the template up front
+    constant_mapping = {
+        key: value
+        for key, value in fixed_mapping.items()
+        if key not in variable_names
+    }
+    if not config["predefined_configs"]:
+        single_values = {
+            key: values[0]
+            for key, values in config["grid_search"].items()
+            if len(values) == 1 and key not in ("IDENTIFIER", "RAWIDENTIFIER")
+        }
+        constant_mapping.update(
+            format_replacements(single_values, config["string_delimiter"])
+        )
+    segments = fold_segments(segments, constant_mapping)
+
     if args.dry_run:
         print_section("Dry Run Complete")
         print(f"Would generate {total_configs} file(s)")
@@ -536,48 +730,69 @@ def main():
     generated_files = []
     failed_files = []
 
-    for idx, (config_type, config_name, params) in enumerate(all_configs, 1):
-        print(f"\n[{idx}/{total_configs}] Generating configuration...")
-
-        # Generate filename
-        filename_prefix, filename = generate_filename(
-            config["output_prefix"], params, idx, config_name
-        )
-        output_path = os.path.join(output_dir, f"{filename}{file_extension}")
-        print(f"  Output file: {output_path}")
-
-        # Combine fixed replacements with current config parameters
-        all_replacements = {**config["replacements"], **params}
-
-        # Generate identifier
-        identifier = generate_identifier(params, config["id"], filename_prefix)
-
-        print(f"  Type: {config_type}")
-        if config_name:
-            print(f"  Name: {config_name}")
-        print(f"  Parameters: {params}")
-        print(f"  $IDENTIFIER: {identifier}")
-
-        # Apply replacements to template
-        output_content = apply_replacements(
-            template,
-            all_replacements,
+    # Files are named in order here, rendering and writing runs in worker threads
+    def make_jobs():
+        for idx, (config_type, config_name, params, names) in enumerate(
+            all_configs, 1
+        ):
+            # Generate filename and identifier
+            filename, identifier = names or build_names(
+                config["output_prefix"], config["id"], params, idx, config_name
+            )
+            output_path = os.path.join(output_dir, f"{filename}{file_extension}")
+            yield idx, output_path, config_type, config_name, params, identifier
+
+    def emit(job):
+        _, output_path, _, config_name, params, identifier = job
+        return emit_file(
+            output_path,
+            segments,
+            params,
             identifier,
             config_name,
             args.verbose,
             config["string_delimiter"],
+            fixed_mapping,
         )
 
-        # Write output file
-        if write_file_safely(output_path, output_content):
-            generated_files.append(
-                (output_path, config_type, config_name, params, identifier)
-            )
-            print(f"  ✓ Successfully created file")
-        else:
-            failed_files.append(
-                (output_path, config_type, config_name, params, identifier)
-            )
+    jobs = make_jobs()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        # Submit bounded batches so that large grids are never held in memory at once
+        for batch in iter(lambda: list(itertools.islice(jobs, JOB_BATCH_SIZE)), []):
+            # Workers never print, their messages are shown here in file order
+            results = executor.map(emit, batch) if args.jobs > 1 else map(emit, batch)
+            for job in batch:
+                idx, output_path, config_type, config_name, params, identifier = job
+                if args.verbose:
+                    print(f"\n[{idx}/{total_configs}] Generating configuration...")
+                    print(f"  Output file: {output_path}")
+                    print(f"  Type: {config_type}")
+                    if config_name:
+                        print(f"  Name: {config_name}")
+                    print(f"  Parameters: {params}")
+                    print(f"  $IDENTIFIER: {identifier}")
+
+                written, messages = next(results)
+                for message in messages:
+                    print(message)
+                if written is None:
+                    sys.exit(1)
+                if written:
+                    generated_files.append(job[1:6])
+                    if args.verbose:
+                        print(f"  ✓ Successfully created file")
+                else:
+                    failed_files.append(job[1:6])
+
+                # Without --verbose only a progress counter is kept up to date
+                if not args.verbose and (
+                    idx % PROGRESS_INTERVAL == 0 or idx == total_configs
+                ):
+                    sys.stdout.write(f"\r[{idx}/{total_configs}] Generating files...")
+                    sys.stdout.flush()
+
+    if not args.verbose and total_configs:
+        sys.stdout.write("\n")
 
     # Create execution script
     print_subsection("Creating Execution Script")
@@ -585,42 +800,40 @@ def main():
     execution_script = f"{config['output_prefix']}_execute_all.sh"
 
     try:
-        with open(execution_script, "w") as es:
-            es.write("#!/bin/bash\n")
-            es.write(f"# Auto-generated execution script\n")
-            es.write(
-                f"# Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            )
-            cfg_id = config["id"]
-            es.write(f"# Identifier: '{cfg_id}'\n")
-            es.write(f"# Total files: {len(generated_files)}\n\n")
-
-            for (
-                file_path,
-                config_type,
-                config_name,
-                params,
-                identifier,
-            ) in generated_files:
-                # Add comment with config info
-                if config_name:
-                    es.write(f"# Config: {config_name} ({config_type})\n")
-                else:
-                    es.write(f"# Config: {config_type}\n")
-                es.write(f"# Identifier: {identifier}\n")
-                es.write(f"# Parameters: {params}\n")
-
-                # Detect file type and add appropriate execution command
-                if file_path.endswith(".sbatch"):
-                    es.write(f"sbatch {file_path}\n")
-                elif file_path.endswith(".sh"):
-                    es.write(f"bash {file_path}\n")
-                elif file_path.endswith(".py"):
-                    es.write(f"python {file_path}\n")
-                else:
-                    es.write(f"# Execute: {file_path}\n")
+        # Build the whole script in memory and write it out at once
+        cfg_id = config["id"]
+        lines = [
+            "#!/bin/bash\n",
+            f"# Auto-generated execution script\n",
+            f"# Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"# Identifier: '{cfg_id}'\n",
+            f"# Total files: {len(generated_files)}\n\n",
+        ]
+
+        for (
+            file_path,
+            config_type,
+            config_name,
+            params,
+            identifier,
+        ) in generated_files:
+            # Add comment with config info
+            if config_name:
+                lines.append(f"# Config: {config_name} ({config_type})\n")
+            else:
+                lines.append(f"# Config: {config_type}\n")
+            lines.append(f"# Identifier: {identifier}\n")
+            lines.append(f"# Parameters: {params}\n")
+
+            # Detect file type and add appropriate execution command
+            command = EXECUTION_COMMANDS.get(os.path.splitext(file_path)[1])
+            if command:
+                lines.append(f"{command} {file_path}\n\n")
+            else:
+                lines.append(f"# Execute: {file_path}\n\n")
 
-                es.write("\n")
+        with open(execution_script, "w") as es:
+            es.writelines(lines)
 
         os.chmod(execution_script, 0o755)
         print(f"✓ Created execution script: {execution_script}")
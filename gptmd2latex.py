@@ -1,41 +1,74 @@
 import re
 import sys
 import argparse
-from collections import OrderedDict
 from latex_math import (
-    process_greek_letters_in_text,
+    GREEK_RE,
+    greek_letter_in_text,
     protect_math_regions,
     restore_math_regions,
     process_math_content,
+    replace_placeholders,
 )
 
 
+# LaTeX structure the converted document is wrapped in
+LATEX_HEADER = """\\documentclass{article}
+            \\usepackage{amsmath, amssymb, url, hyperref}
+            \\begin{document}
+            """
+LATEX_FOOTER = """
+        \\end{document}
+        """
+
+# Special characters replaced in a single pass by clean_text
+CLEAN_TEXT_TABLE = str.maketrans(
+    {
+        "&": "\\&",  # Fix ampersand for LaTeX
+        "%": "\\%",  # Escape percent signs
+    }
+)
+
+# Patterns are compiled once at import instead of on every call
+HREF_RE = re.compile(r"(\\href\{[^}]+\}\{[^}]+\})")
+EMPTY_HREF_RE = re.compile(r"(\\href\{([^{}]*)\}\{\})")
+LINK_RE = re.compile(r"\[(.*?)\]\((https?:\/\/[^\s]+)\)")
+REFERENCE_RE = re.compile(r"\[(.*?)\]\((https?:\/\/[^\s)]+)(?:[^\)])?\)")
+# The title runs to the end of the line, so the pattern needs no trailing anchor
+SECTION_NUMBER_RE = re.compile(
+    r"^(#+)(?!#)\s*\**\d+(?:\.\d+)*\.?\s*(.*)", flags=re.MULTILINE
+)
+CODE_BLOCK_RE = re.compile(r"```(.*?)```", flags=re.DOTALL)
+CODE_PLACEHOLDER_RE = re.compile(r"__CODE_BLOCK_\d+__")
+LIST_SECTION_RE = re.compile(r"(?:^|\n)(?:- .*(?:\n|$))+")
+LIST_ITEM_RE = re.compile(r"^- (.*)$", flags=re.MULTILINE)
+HEADER_LEVEL_RE = re.compile(r"\n(#+) ")
+SUBHEADER_RE = re.compile(r"\n#{2,}")
+HEADER_RE = re.compile(r"^(#{1,5}) (.*?)$", flags=re.MULTILINE)
+# LaTeX commands for headers by level, level 5 headers become plain text
+HEADER_COMMANDS = ["\\section", "\\subsection", "\\subsubsection", "\\paragraph"]
+BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+# Italic text or a Greek letter in text, both converted in the same pass
+ITALIC_OR_GREEK_RE = re.compile(r"\*(.*?)\*|" + GREEK_RE.pattern)
+
+
 def clean_text(text):
     """Clean special characters for LaTeX"""
-    text = text.replace("&", "\\&")  # Fix ampersand for LaTeX
-    text = text.replace(
-        """, "``")   # Fix opening quotes
-    text = text.replace(""",
-        "''",
-    )  # Fix closing quotes
-    text = text.replace("%", "\\%")  # Escape percent signs
     # Don't escape underscores globally - will handle in context
-    return text
+    return text.translate(CLEAN_TEXT_TABLE)
 
 
 def clean_url(url):
     """Clean URLs by removing fragments and parameters"""
     # return re.sub(r"[#?].*", "", url)  # Remove fragments and parameters from URL
     # print(f"clean url {url}")
-    return url.split("#")[0]
+    return url.partition("#")[0]
 
 
 def fix_missing_parenthesis_href(text):
     """
     Appends ")" after each \\href{something}{something} occurrence.
     """
-    pattern = r"(\\href\{[^}]+\}\{[^}]+\})"
-    modified_text = re.sub(pattern, r"\1)", text)
+    modified_text = HREF_RE.sub(r"\1)", text)
     return modified_text
 
 
@@ -47,25 +80,26 @@ def replace_empty_hrefs(latex_text: str, href_directly: bool = True) -> str:
         latex_text (str): The input LaTeX string.
         href_directly (bool): If True, use the URL as link text
     """
-    pattern = re.compile(r"(\\href\{([^{}]*)\}\{\})")
-
     if href_directly:
-        return pattern.sub(
+        return EMPTY_HREF_RE.sub(
             lambda m: f"\\href{{{m.group(2)}}}{{{m.group(2)}}}", latex_text
         )
     else:
-        return pattern.sub(lambda m: f"\\href{{{m.group(2)}}}{{link}}", latex_text)
+        return EMPTY_HREF_RE.sub(
+            lambda m: f"\\href{{{m.group(2)}}}{{link}}", latex_text
+        )
+
+
+def convert_link(match):
+    """Convert a markdown link match of LINK_RE to a LaTeX href command"""
+    return f"\\href{{{clean_url(match.group(2))}}}{{{match.group(1)}}}"
 
 
 def process_links(content):
     """
     Process all markdown links to LaTeX href commands with improved cleaning
     """
-    content = re.sub(
-        r"\[(.*?)\]\((https?:\/\/[^\s]+)\)",
-        lambda m: f"\\href{{{clean_url(m.group(2))}}}{{{m.group(1)}}}",
-        content,
-    )
+    content = LINK_RE.sub(convert_link, content)
     content = replace_empty_hrefs(content)
     content = fix_missing_parenthesis_href(content)
     return content
@@ -82,13 +116,13 @@ def remove_duplicates(pairs):
     Returns:
         list of tuple: Filtered list maintaining order and longest value preference.
     """
-    seen = OrderedDict()
+    seen = {}  # dicts keep insertion order
 
     for value, key in pairs:
         if key not in seen or len(value) > len(seen[key]):
             seen[key] = value
 
-    return [(seen[key], key) for key in seen]
+    return [(value, key) for key, value in seen.items()]
 
 
 def collect_references(content):
@@ -98,8 +132,7 @@ def collect_references(content):
     """
     references = []
     # Match [text](url) pattern
-    pattern = r"\[(.*?)\]\((https?:\/\/[^\s)]+)(?:[^\)])?\)"
-    for match in re.finditer(pattern, content):
+    for match in REFERENCE_RE.finditer(content):
         link_text = match.group(1)
         url = clean_url(match.group(2))
         link_text = link_text.split("]")[-1]
@@ -110,36 +143,59 @@ def collect_references(content):
 
 def upgrade_sections_depth(text):
     """Upgrade section levels if needed"""
-    i = 0
-    while not ("\n# " in text):
-        text = text.replace("\n##", "\n#")
-        i += 1
-        if i > 4:
-            break
-    return text
+    # Raise all headers by the same number of levels (at most 5) until the
+    # highest one becomes a top level section
+    levels = map(len, HEADER_LEVEL_RE.findall(text))
+    shift = min(min(levels, default=6) - 1, 5)
+    if shift <= 0:
+        return text
+    return SUBHEADER_RE.sub(
+        lambda m: "\n" + "#" * max(len(m.group(0)) - 1 - shift, 1), text
+    )
 
 
 def remove_section_numbers(markdown_text):
     """
     Removes hardcoded section numbers from markdown headers, ensuring robustness for various formats.
     """
-    pattern = r"^(#+)\s*\**\d+(?:\.\d+)*\.?\s*(.*)\**$"
-    modified_text = re.sub(pattern, r"\1 **\2**", markdown_text, flags=re.MULTILINE)
+    modified_text = SECTION_NUMBER_RE.sub(r"\1 **\2**", markdown_text)
     return modified_text
 
 
+def convert_header(match):
+    """Convert a markdown header match of HEADER_RE to LaTeX"""
+    level = len(match.group(1))
+    if level > len(HEADER_COMMANDS):
+        return match.group(2)
+    return f"{HEADER_COMMANDS[level - 1]}{{{match.group(2)}}}"
+
+
+def convert_italic_or_greek(match):
+    """Convert an ITALIC_OR_GREEK_RE match to LaTeX"""
+    text = match.group(1)
+    if text is None:
+        return greek_letter_in_text(match)
+    # Italic text cannot contain "*", only Greek letters are left to convert
+    return f"\\textit{{{GREEK_RE.sub(greek_letter_in_text, text)}}}"
+
+
 def protect_code_blocks(content):
     code_blocks = {}
-    for i, match in enumerate(re.finditer(r"```(.*?)```", content, flags=re.DOTALL)):
-        placeholder = f"__CODE_BLOCK_{i}__"
+
+    # Swap each block for its placeholder in a single pass over the content
+    def replace_block(match):
+        placeholder = f"__CODE_BLOCK_{len(code_blocks)}__"
         code_blocks[placeholder] = match.group(0)
-        content = content.replace(match.group(0), placeholder, 1)
+        return placeholder
+
+    content = CODE_BLOCK_RE.sub(replace_block, content)
     return content, code_blocks
 
 
 def restore_code_blocks(content, code_blocks):
+    replacements = {}
     for placeholder, code_block in code_blocks.items():
-        code_match = re.match(r"```(.*?)```", code_block, flags=re.DOTALL)
+        code_match = CODE_BLOCK_RE.match(code_block)
         if code_match:
             code_content = code_match.group(1)
             language_line = code_content.split("\n", 1)
@@ -155,21 +211,22 @@ def restore_code_blocks(content, code_blocks):
                 # Regular code blocks go to verbatim
                 replacement = f"\\begin{{verbatim}}{code_content}\\end{{verbatim}}"
 
-            content = content.replace(placeholder, replacement)
-    return content
+            replacements[placeholder] = replacement
+    return replace_placeholders(content, replacements, CODE_PLACEHOLDER_RE)
+
+
+def convert_list(match):
+    """Convert a markdown list matched by LIST_SECTION_RE to an itemize environment"""
+    lines = ["\\begin{itemize}\n"]
+    for item in LIST_ITEM_RE.findall(match.group(0)):
+        lines.append(f"\\item {item.strip()}\n")
+    lines.append("\\end{itemize}")
+    return "".join(lines)
 
 
 def process_lists(content):
-    list_sections = re.findall(r"(?:^|\n)(?:- .*(?:\n|$))+", content)
-    for section in list_sections:
-        items = re.findall(r"^- (.*)$", section, re.MULTILINE)
-        if items:
-            replacement = "\\begin{itemize}\n"
-            for item in items:
-                replacement += f"\\item {item.strip()}\n"
-            replacement += "\\end{itemize}"
-            content = content.replace(section, replacement)
-    return content
+    # Each list is replaced where it was found, in one pass over the content
+    return LIST_SECTION_RE.sub(convert_list, content)
 
 
 def markdown_to_latex(input_file, output_file, include_references=True):
@@ -192,20 +249,13 @@ def markdown_to_latex(input_file, output_file, include_references=True):
     # Step 4: Convert headers
     content = remove_section_numbers(content)
     content = upgrade_sections_depth(content)
-    content = re.sub(r"^# (.*?)$", r"\\section{\1}", content, flags=re.MULTILINE)
-    content = re.sub(r"^## (.*?)$", r"\\subsection{\1}", content, flags=re.MULTILINE)
-    content = re.sub(
-        r"^### (.*?)$", r"\\subsubsection{\1}", content, flags=re.MULTILINE
-    )
-    content = re.sub(r"^#### (.*?)$", r"\\paragraph{\1}", content, flags=re.MULTILINE)
-    content = re.sub(r"^##### (.*?)$", r"\1", content, flags=re.MULTILINE)
+    content = HEADER_RE.sub(convert_header, content)
 
-    # Step 5: Apply markdown formatting (bold, italic, etc.)
-    content = re.sub(r"\*\*(.*?)\*\*", r"\\textbf{\1}", content)
-    content = re.sub(r"\*(.*?)\*", r"\\textit{\1}", content)
+    # Step 5: Apply markdown formatting (bold, then italic below)
+    content = BOLD_RE.sub(r"\\textbf{\1}", content)
 
-    # Step 6: Process Greek letters in text portions
-    content = process_greek_letters_in_text(content, math_regions)
+    # Step 6: Italics and Greek letters in text portions, in one pass
+    content = ITALIC_OR_GREEK_RE.sub(convert_italic_or_greek, content)
 
     # Step 7: Process links
     # Use the new link processing function
@@ -223,30 +273,21 @@ def markdown_to_latex(input_file, output_file, include_references=True):
     # Process itemized lists
     content = process_lists(content)
 
+    # Wrap document in LaTeX structure
+    parts = [LATEX_HEADER, content]
+
     # Add references section if requested
     if include_references and references:
-        content += "\n\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%\n\n\\section{References}\n\\begin{enumerate}\n"
-        for i, (text, url) in enumerate(references, 1):
-            content += f"\\item {text}: \\url{{{url}}}\n"
-        content += "\\end{enumerate}\n"
-
-    # Final cleanup - check for trailing periods after \href commands
-    content = re.sub(r"(\\href\{[^{}]*\}\{[^{}]*\})\.", r"\1.", content)
+        parts.append("\n\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%\n\n\\section{References}\n\\begin{enumerate}\n")
+        for text, url in references:
+            parts.append(f"\\item {text}: \\url{{{url}}}\n")
+        parts.append("\\end{enumerate}\n")
 
-    # Wrap document in LaTeX structure
-    latex_doc = (
-        """\\documentclass{article}
-            \\usepackage{amsmath, amssymb, url, hyperref}
-            \\begin{document}
-            """
-        + content
-        + """
-        \\end{document}
-        """
-    )
+    parts.append(LATEX_FOOTER)
 
+    # Written piece by piece, the whole document is never copied into one string
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write(latex_doc)
+        f.writelines(parts)
 
     print(f"Converted {input_file} to {output_file}")
 
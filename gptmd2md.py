@@ -1,6 +1,5 @@
 import re
 import argparse
-from collections import OrderedDict
 from latex_math import (
     process_greek_letters_in_text,
     protect_math_regions,
@@ -8,15 +7,25 @@ from latex_math import (
 )
 
 
+# Special characters replaced in a single pass by clean_text
+CLEAN_TEXT_TABLE = str.maketrans(
+    {
+        "&": "and",  # Fix ampersand for LaTeX
+        "`": "'",  # Fix opening quotes
+        "’": "'",
+        "“": '"',
+        "”": '"',
+    }
+)
+
+# Patterns are compiled once at import instead of on every call
+UNNAMED_LINK_RE = re.compile(r"\[\]\((https?://[^\s\)]+)\)")
+REFERENCE_RE = re.compile(r"\[(.*?)\]\((https?:\/\/[^\s)]+)(?:[^\)])?\)")
+
+
 def clean_text(text):
     """Clean special characters for LaTeX"""
-    text = text.replace("&", "and")  # Fix ampersand for LaTeX
-    text = text.replace("`", "'")  # Fix opening quotes
-    text = text.replace("’", "'")  # Fix opening quotes
-    text = text.replace("“", '"')  # Fix opening quotes
-    text = text.replace("”", '"')  # Fix opening quotes
-
-    return text
+    return text.translate(CLEAN_TEXT_TABLE)
 
 
 def clean_url(url):
@@ -37,13 +46,13 @@ def remove_duplicates(pairs):
     Returns:
         list of tuple: Filtered list maintaining order and longest value preference.
     """
-    seen = OrderedDict()
+    seen = {}  # dicts keep insertion order
 
     for value, key in pairs:
         if key not in seen or len(value) > len(seen[key]):
             seen[key] = value
 
-    return [(seen[key], key) for key in seen]
+    return [(value, key) for key, value in seen.items()]
 
 
 def replace_unnamed_links(markdown_text):
@@ -56,16 +65,13 @@ def replace_unnamed_links(markdown_text):
     Returns:
     str: Modified Markdown text with href values as names for unnamed links.
     """
-    # Regex to find Markdown links with empty display text
-    pattern = r"\[\]\((https?://[^\s\)]+)\)"
-
     # Function to replace the matched pattern
     def replacer(match):
         url = match.group(1)
         return f"[{clean_url(url)}]({url})"
 
     # Replace all occurrences of the pattern
-    return re.sub(pattern, replacer, markdown_text)
+    return UNNAMED_LINK_RE.sub(replacer, markdown_text)
 
 
 def collect_references(content):
@@ -75,8 +81,7 @@ def collect_references(content):
     """
     references = []
     # Match [text](url) pattern
-    pattern = r"\[(.*?)\]\((https?:\/\/[^\s)]+)(?:[^\)])?\)"
-    for match in re.finditer(pattern, content):
+    for match in REFERENCE_RE.finditer(content):
         link_text = match.group(1)
         url = clean_url(match.group(2))
         link_text = link_text.split("]")[-1]
@@ -125,15 +130,17 @@ def clean_markdown(
         escape_underscores=escape_underscores,
     )
 
+    parts = [content]
+
     # Add references section if requested
     if include_references and references:
-        content += "\n\n# References\n"
-        for i, (text, url) in enumerate(references, 1):
-            content += f" - {text}: {url}\n"
+        parts.append("\n\n# References\n")
+        for text, url in references:
+            parts.append(f" - {text}: {url}\n")
 
-    # Wrap document
+    # Written piece by piece, the whole document is never copied into one string
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write(content)
+        f.writelines(parts)
 
     print(f"Converted {input_file} to {output_file}")
 
@@ -40,40 +40,94 @@ greek_letters = {
     "Ω": "\\Omega",
 }
 
+# Bracket sizing and spacing commands simplified in equations
+BRACKET_SIZING = {
+    "\\left(": "(",
+    "\\right)": ")",
+    "\\left[": "[",
+    "\\right]": "]",
+    "\\left{": "{",
+    "\\right}": "}",
+    "\\!": "",
+}
+BRACKET_SIZING_RE = re.compile("|".join(map(re.escape, BRACKET_SIZING)))
+
+# Operators surrounded by matching spacing commands, or single characters to fix
+EQUATION_SPACING_RE = re.compile(
+    r"\n?(;|\\;|\\,)(=|\||\\le|\\ge|\\\||-)\1"  # e.g. ";=;" or "\,=\,"
+    r"|\\,|\\\||[=·…*]"
+)
+EQUATION_SPACING = {
+    "\\,": " ",
+    "\\|": " | ",
+    "=": " = ",  # Ensure proper spacing around equals sign
+    "·": "\\cdot ",
+    "…": "\\ldots ",
+    "*": "\\ast ",  # Treat asterisks as multiplication
+}
 
-def simplify_equations(equation):
-    """Clean up equation formatting for LaTeX"""
-    equation = equation.replace("\\left(", "(").replace("\\right)", ")")
-    equation = equation.replace("\\left[", "[").replace("\\right]", "]")
-    equation = equation.replace("\\left{", "{").replace("\\right}", "}")
-    equation = equation.replace("\\!", "")  # Remove unnecessary spacing commands
-
-    for s in ["=", "|", "\\le", "\\ge", "\\|", "-"]:
 
-        equation = equation.replace(f"\n;{s};", f" {s} ")
-        equation = equation.replace(f"\n\\;{s}\\;", f" {s} ")
-        equation = equation.replace(f"\n\\,{s}\\,", f" {s} ")
+def _space_equation_match(match):
+    """Replacement for EQUATION_SPACING_RE matches."""
+    operator = match.group(2)
+    if operator is None:
+        return EQUATION_SPACING[match.group(0)]
+    # = and \| between spacing commands get spaced once more, like everywhere else
+    return " " + EQUATION_SPACING.get(operator, operator) + " "
+
+
+# Any single Greek letter from the mapping above
+GREEK_RE = re.compile("[" + "".join(map(re.escape, greek_letters)) + "]")
+
+# Math regions by kind, display math listed before inline math. Inline $..$ is
+# never directly followed by another $, so a stray $ in text cannot reach into
+# $$..$$. Directly abutting inline regions ($a$$b$) are matched as a whole,
+# unless their $$ would open display math closed by a later $$
+MATH_RE = re.compile(
+    r"(?P<display_dollars>\$\$(.*?)\$\$)"
+    r"|(?P<display_brackets>\\\[(.*?)\\\])"
+    r"|(?P<display_equation>\\begin{equation}(.*?)\\end{equation})"
+    r"|(?P<inline_paren>\\\((.*?)\\\))"
+    r"|(?P<inline_dollars>(?:(?<!\$)|(?<=\$\$))\$[^$]+\$"
+    r"(?:(?!\$.*?\$\$)\$[^$]+\$)*(?!\$))",
+    flags=re.DOTALL,
+)
+MATH_PLACEHOLDERS = {
+    "display_dollars": "__DISPLAY_MATH_DOLLARS_{}__",
+    "display_brackets": "__DISPLAY_MATH_BRACKETS_{}__",
+    "display_equation": "__DISPLAY_MATH_EQUATION_{}__",
+    "inline_paren": "__INLINE_MATH_PAREN_{}__",
+    "inline_dollars": "__INLINE_MATH_DOLLARS_{}__",
+}
+# Markers around each kind of math region and whether it is display math
+MATH_MARKERS = {
+    "display_dollars": ("$$", "$$", True),
+    "display_brackets": ("\\[", "\\]", True),
+    "display_equation": ("\\begin{equation}", "\\end{equation}", True),
+    "inline_paren": ("\\(", "\\)", False),
+    "inline_dollars": ("$", "$", False),
+}
+# Matches any of the placeholders above, whatever document they come from
+MATH_PLACEHOLDER_RE = re.compile(r"__(?:DISPLAY|INLINE)_MATH_[A-Z]+_\d+__")
 
-        equation = equation.replace(f";{s};", f" {s} ")
-        equation = equation.replace(f"\\;{s}\\;", f" {s} ")
-        equation = equation.replace(f"\\,{s}\\,", f" {s} ")
-    equation = equation.replace("\\,", " ")
-    equation = equation.replace("\\|", " | ")
+# Single character subscripts, e.g. x_i
+SUBSCRIPT_RE = re.compile(r"_([a-zA-Z0-9])")
 
-    equation = equation.replace("=", " = ")  # Ensure proper spacing around equals sign
 
-    # Fix common special characters in math
-    equation = equation.replace("·", "\\cdot ")
-    equation = equation.replace("…", "\\ldots ")
-    equation = equation.replace("*", "\\ast ")  # Treat asterisks as multiplication
+def simplify_equations(equation):
+    """Clean up equation formatting for LaTeX"""
+    # Drop \left/\right sizing and unnecessary spacing commands
+    equation = BRACKET_SIZING_RE.sub(lambda m: BRACKET_SIZING[m.group(0)], equation)
 
-    return equation
+    # Space out operators between matching spacing commands (;=; \;=\; \,=\,),
+    # joining them to the previous line, then fix the remaining characters
+    return EQUATION_SPACING_RE.sub(_space_equation_match, equation)
 
 
 def process_subscripts_in_math(math_content):
     """Process subscripts in math content to ensure proper LaTeX format"""
     # This regex finds patterns like x_i, x_{i}, etc.
-    math_content = re.sub(r"_([a-zA-Z0-9])", r"_{\1}", math_content)
+    math_content = SUBSCRIPT_RE.sub(r"_{\1}", math_content)
 
     return math_content
 
@@ -84,97 +138,29 @@ def protect_math_regions(content):
     Returns the modified content and a mapping to restore the math regions later
     """
     math_regions = {}
-
-    # Handle display math first: $$..$$ and \[..\]
-    patterns = [
-        (
-            r"\$\$(.*?)\$\$",
-            "__DISPLAY_MATH_DOLLARS_{}__",
-        ),  # Correctly handles double dollar display math
-        (
-            r"\$(.*?)\$",
-            "__INLINE_MATH_DOLLARS_{}__",
-        ),  # Added pattern for single dollar inline math
-        (
-            r"\\\[(.*?)\\\]",
-            "__DISPLAY_MATH_BRACKETS_{}__",
-        ),  # Corrects handling for \\[ \\] display math
-        (
-            r"\\\((.*?)\\\)",
-            "__INLINE_MATH_PAREN_{}__",
-        ),  # Added pattern for \\( \\) inline math
-        (
-            r"\\begin{equation}(.*?)\\end{equation}",
-            "__DISPLAY_MATH_EQUATION_{}__",
-        ),  # Correct pattern for equation environment
-    ]
-
-    for pattern, placeholder_template in patterns:
-        matches = re.finditer(pattern, content, re.DOTALL)
-        offset = 0
-        content_modified = content
-
-        for i, match in enumerate(matches):
-            full_match = match.group(0)
-            # math_content = match.group(1)
-            placeholder = placeholder_template.format(i)
-
-            # Get position in the modified content
-            start_pos = content_modified.find(full_match, offset)
-            if start_pos == -1:
-                continue
-
-            end_pos = start_pos + len(full_match)
-
-            # Replace this instance with placeholder
-            content_modified = (
-                content_modified[:start_pos] + placeholder + content_modified[end_pos:]
+    counts = dict.fromkeys(MATH_PLACEHOLDERS, 0)
+
+    def replace_math(match):
+        kind = match.lastgroup
+        math_text = match.group(0)
+        if kind == "inline_dollars" and "$$" in math_text:
+            # Abutting inline regions, each gets its own placeholder
+            return "".join(
+                protect_region(kind, f"${region}$")
+                for region in math_text[1:-1].split("$$")
             )
+        return protect_region(kind, math_text)
 
-            # Store the original content
-            math_regions[placeholder] = full_match
-
-            # Update offset for next search
-            offset = start_pos + len(placeholder)
+    def protect_region(kind, math_text):
+        placeholder = MATH_PLACEHOLDERS[kind].format(counts[kind])
+        counts[kind] += 1
+        # Store the original content along with its kind
+        math_regions[placeholder] = (kind, math_text)
+        return placeholder
 
-        content = content_modified
-
-    # Now handle inline math $...$
-    inline_matches = re.finditer(r"\$(.*?)\$", content, re.DOTALL)
-    offset = 0
-    content_modified = content
-
-    for i, match in enumerate(inline_matches):
-        full_match = match.group(0)
-        # math_content = match.group(1)
-        placeholder = f"__INLINE_MATH_{i}__"
-
-        # Get position in the modified content
-        start_pos = content_modified.find(full_match, offset)
-        if start_pos == -1:
-            continue
-
-        end_pos = start_pos + len(full_match)
-
-        # Make sure this is not part of a display math that was missed
-        if (start_pos > 0 and content_modified[start_pos - 1] == "$") or (
-            end_pos < len(content_modified) and content_modified[end_pos] == "$"
-        ):
-            offset = end_pos
-            continue
-
-        # Replace this instance with placeholder
-        content_modified = (
-            content_modified[:start_pos] + placeholder + content_modified[end_pos:]
-        )
-
-        # Store the original content
-        math_regions[placeholder] = full_match
-
-        # Update offset for next search
-        offset = start_pos + len(placeholder)
-
-    return content_modified, math_regions
+    # All kinds of math are found in one pass, $$..$$ wins over $..$
+    content = MATH_RE.sub(replace_math, content)
+    return content, math_regions
 
 
 def remove_prefix(input_string, prefix):
@@ -188,9 +174,7 @@ def remove_prefix(input_string, prefix):
     Returns:
     str: The string with the prefix removed if it was present.
     """
-    if input_string.startswith(prefix):
-        return input_string[len(prefix) :]
-    return input_string
+    return input_string.removeprefix(prefix)
 
 
 def remove_suffix(input_string, suffix):
@@ -204,13 +188,11 @@ def remove_suffix(input_string, suffix):
     Returns:
     str: The string with the suffix removed if it was present.
     """
-    if input_string.endswith(suffix):
-        return input_string[: -len(suffix)]
-    return input_string
+    return input_string.removesuffix(suffix)
 
 
 def remove_presuffix(input_string, prefix, suffix):
-    return remove_suffix(remove_prefix(input_string, prefix), suffix)
+    return input_string.removeprefix(prefix).removesuffix(suffix)
 
 
 def remove_math_presuffix(input_string):
@@ -222,7 +204,7 @@ def remove_math_presuffix(input_string):
         ("\\(", "\\)"),
     ]
     for prefix, suffix in prefixes_suffixes:
-        output_string = remove_suffix(remove_prefix(input_string, prefix), suffix)
+        output_string = input_string.removeprefix(prefix).removesuffix(suffix)
         if output_string != input_string:
             break
         input_string = output_string
@@ -235,8 +217,7 @@ def process_math_content(math_content, escape_underscores=False):
     math_content = math_content.replace("\\_", "_")
 
     # Convert Greek letters
-    for greek, latex in greek_letters.items():
-        math_content = math_content.replace(greek, latex)
+    math_content = GREEK_RE.sub(lambda m: greek_letters[m.group(0)], math_content)
 
     # Handle subscripts
     math_content = process_subscripts_in_math(math_content)
@@ -250,6 +231,19 @@ def process_math_content(math_content, escape_underscores=False):
     return math_content.strip()
 
 
+def replace_placeholders(content, replacements, placeholder_re):
+    """Replace placeholders matched by placeholder_re in one pass over content
+
+    Only placeholders that are keys of replacements are replaced, any other
+    match is left as it is.
+    """
+    if not replacements:
+        return content
+    return placeholder_re.sub(
+        lambda m: replacements.get(m.group(0), m.group(0)), content
+    )
+
+
 def restore_math_regions(
     content,
     math_regions,
@@ -263,80 +257,31 @@ def restore_math_regions(
     inline_math_marker_end="$",
     escape_underscores=False,
 ):
-    for placeholder, math_text in math_regions.items():
-        # Process based on placeholder type
-        if placeholder.startswith("__DISPLAY_MATH_DOLLARS_"):
-            # Display math mode with $$..$$
-            math_content = remove_presuffix(math_text, "$$", "$$")  # Remove $$ markers
-            processed_math = process_math_content(math_content, escape_underscores)
-            math_regions[
-                placeholder
-            ] = f"{eq_marker}\n{processed_math}\n{eq_marker_end}"
-        elif placeholder.startswith("__DISPLAY_MATH_BRACKETS_"):
-            # Already in display math mode with \[..\]
-            math_content = remove_presuffix(
-                math_text, "\\[", "\\]"
-            )  # Remove \[ and \] markers
-            processed_math = process_math_content(math_content, escape_underscores)
-            math_regions[
-                placeholder
-            ] = f"{eq_marker}\n{processed_math}\n{eq_marker_end}"
-        elif placeholder.startswith("__DISPLAY_MATH_EQUATION_"):
-            # Already in equation environment
-            math_content = math_content = remove_presuffix(
-                math_text, "\\begin{equation}", "\\end{equation}"
-            )
-            processed_math = process_math_content(math_content, escape_underscores)
-            math_regions[
-                placeholder
-            ] = f"{eq_marker}\n{processed_math}\n{eq_marker_end}"
-        elif placeholder.startswith("__INLINE_MATH_"):
-            # Inline math with $...$
-            math_content = remove_math_presuffix(math_text)  # Remove markers
-            processed_math = process_math_content(math_content, escape_underscores)
-            math_regions[
-                placeholder
-            ] = f"{inline_math_marker}{processed_math}{inline_math_marker_end}"
+    restored = {}
+    for placeholder, (kind, math_text) in math_regions.items():
+        prefix, suffix, display = MATH_MARKERS[kind]
+        # Regions always start and end with their markers, slice them off
+        math_content = math_text[len(prefix) : len(math_text) - len(suffix)]
+        processed_math = process_math_content(math_content, escape_underscores)
+        if display:
+            restored[placeholder] = f"{eq_marker}\n{processed_math}\n{eq_marker_end}"
         else:
-            print("Failed: unknown placeholder={placeholder}")
+            restored[placeholder] = (
+                f"{inline_math_marker}{processed_math}{inline_math_marker_end}"
+            )
+
+    # Restore math regions (already processed earlier) in a single pass
+    return replace_placeholders(content, restored, MATH_PLACEHOLDER_RE)
+
 
-    # Restore math regions (already processed earlier)
-    for placeholder, processed_math_text in math_regions.items():
-        content = content.replace(placeholder, processed_math_text)
-    return content
+def greek_letter_in_text(match):
+    """Write a Greek letter matched in text (non-math) as inline math"""
+    return f"${greek_letters[match.group(0)]}$"
 
 
 def process_greek_letters_in_text(content, math_regions):
     """Process Greek letters in text (non-math) portions"""
-    # Process text character by character, skipping math placeholders
-    result = []
-    i = 0
-    while i < len(content):
-        # Check if current position starts a math placeholder
-        is_math_placeholder = False
-        for placeholder in math_regions.keys():
-            if content[i:].startswith(placeholder):
-                result.append(placeholder)
-                i += len(placeholder)
-                is_math_placeholder = True
-                break
-
-        if is_math_placeholder:
-            continue
-
-        # If not a math placeholder, check for Greek letters
-        found_greek = False
-        for greek, latex in greek_letters.items():
-            if i + len(greek) <= len(content) and content[i : i + len(greek)] == greek:
-                result.append(
-                    f"${latex}$"
-                )  # Changed to use inline math for Greek in text
-                i += len(greek)
-                found_greek = True
-                break
-
-        if not found_greek:
-            result.append(content[i])
-            i += 1
-
-    return "".join(result)
+    # Math regions are already replaced by ASCII-only placeholders, so every
+    # Greek letter left in the content is text and one pass converts them all
+    # Greek letters in text are written as inline math
+    return GREEK_RE.sub(greek_letter_in_text, content)